@@ -1,71 +1,148 @@
-from flask import Flask, render_template, request, redirect
-import json, os, random, logging
+from flask import Flask, render_template, request, redirect, jsonify
+import csv, io, os, queue, logging, atexit
 from datetime import datetime, date
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueListener
+from src.journal import open_store
+from src.accounts import AccountRepository
+from src.engine import TransferEngine, TransferError
+from src.history import TransferHistory
+from src.audit import AuditPipeline, DroppingQueueHandler
+from src.faults import FaultInjector, parse_rules
 
 app = Flask(__name__)
-TRANSFER_LOG = "data/transfers.json"
-ACCOUNTS_FILE = "data/accounts.json"
-AUDIT_LOG_JSON = "data/audit_log.json"
+DATA_DIR = os.environ.get("BANK_DATA_DIR", "data")
+TRANSFER_LOG = os.path.join(DATA_DIR, "transfers")
+ACCOUNTS_FILE = os.path.join(DATA_DIR, "accounts.json")
+AUDIT_LOG_JSON = os.path.join(DATA_DIR, "audit_log")
+AUDIT_MAX_ENTRIES = 20
+
+# "thread" locks per account inside one process; "process" also takes a file
+# lock so several worker processes can share data/accounts.json
+LOCK_MODE = os.environ.get("BANK_LOCK_MODE", "thread")
+
+# "journal" appends one line per record; "json" keeps the old whole-file rewrite
+STORAGE_BACKEND = os.environ.get("BANK_STORAGE", "journal")
+
+def journal_options(base_path):
+    # Worker processes sharing a journal serialize appends and compaction
+    if STORAGE_BACKEND == "journal" and LOCK_MODE == "process":
+        return {"lock_path": base_path + ".jsonl.lock"}
+    return {}
+
+transfer_store = open_store(TRANSFER_LOG, STORAGE_BACKEND, **journal_options(TRANSFER_LOG))
+audit_store = open_store(AUDIT_LOG_JSON, STORAGE_BACKEND, max_entries=AUDIT_MAX_ENTRIES, **journal_options(AUDIT_LOG_JSON))
+atexit.register(transfer_store.close)
+atexit.register(audit_store.close)
+history = TransferHistory(transfer_store)
+
+# Audit entries are written by a background thread; a full queue waits
+# BANK_AUDIT_BLOCK_TIMEOUT seconds and then drops (see /audit/stats)
+audit_pipeline = AuditPipeline(
+    audit_store,
+    max_queue=int(os.environ.get("BANK_AUDIT_QUEUE_SIZE", "1000")),
+    block_timeout=float(os.environ.get("BANK_AUDIT_BLOCK_TIMEOUT", "0.1"))
+)
+atexit.register(audit_pipeline.close)
+
+# Seconds to batch balance changes before rewriting accounts.json (0 = write through)
+ACCOUNTS_FLUSH_INTERVAL = float(os.environ.get("BANK_ACCOUNTS_FLUSH_INTERVAL", "1.0"))
+account_repo = AccountRepository(ACCOUNTS_FILE, flush_interval=ACCOUNTS_FLUSH_INTERVAL)
+atexit.register(account_repo.close)
+
+# Simulated network failures: BANK_FAULT_RATE=0 turns them off, BANK_FAULT_SEED
+# makes them repeatable, BANK_FAULT_RULES="transfer=0.2,transfer_batch=0" sets
+# per-endpoint rates
+faults = FaultInjector(
+    rate=float(os.environ.get("BANK_FAULT_RATE", "0.1")),
+    seed=int(os.environ["BANK_FAULT_SEED"]) if os.environ.get("BANK_FAULT_SEED") else None,
+    rules=parse_rules(os.environ.get("BANK_FAULT_RULES"))
+)
+engine = TransferEngine(account_repo, mode=LOCK_MODE, faults=faults)
 
 # Create a rotating file handler
 handler = RotatingFileHandler(
-    "data/server.log",     # Log file path
+    os.path.join(DATA_DIR, "server.log"),  # Log file path
     maxBytes=10 * 1024,    # Max size ~10KB (adjust as needed)
     backupCount=1          # Only keep the latest log file
 )
 
-# Set up the root logger to use the rotating handler
+handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+
+# Requests only put log records on a queue; the listener thread formats
+# them and writes server.log
+log_handler = DroppingQueueHandler(queue.Queue(maxsize=10000))
+log_listener = QueueListener(log_handler.queue, handler)
+log_listener.start()
+atexit.register(log_listener.stop)
+
+# Set up the root logger to use the queue handler
 logging.basicConfig(
     level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[handler]
+    handlers=[log_handler]
 )
 
 def load_accounts():
-    if not os.path.exists(ACCOUNTS_FILE):
-        return {}
-    with open(ACCOUNTS_FILE, "r") as f:
-        return json.load(f)
+    return account_repo.all()
 
 def save_accounts(accounts):
-    with open(ACCOUNTS_FILE, "w") as f:
-        json.dump(accounts, f, indent=2)
+    account_repo.update(accounts)
 
 def load_transfers():
-    if not os.path.exists(TRANSFER_LOG):
-        return []
-    with open(TRANSFER_LOG, "r") as f:
-        return json.load(f)
+    return transfer_store.read_all()
 
 def save_transfer(entry):
-    data = load_transfers()
-    data.append(entry)
-    with open(TRANSFER_LOG, "w") as f:
-        json.dump(data, f, indent=2)
-
-def append_audit_log(entry, max_entries=20):
-    audit_data = []
-
-    if os.path.exists(AUDIT_LOG_JSON):
-        with open(AUDIT_LOG_JSON, "r") as f:
-            try:
-                audit_data = json.load(f)
-            except json.JSONDecodeError:
-                audit_data = []  # File exists but is empty or corrupt
+    transfer_store.append(entry)
+
+def append_audit_log(entry):
+    # Queued for the background writer; only the newest AUDIT_MAX_ENTRIES entries are kept
+    audit_pipeline.submit(entry)
+
+def make_transfer_entry(src, dest, amount, trans_date):
+    return {
+        "source": src,
+        "destination": dest,
+        "amount": amount,
+        "date": trans_date,
+        "submitted": datetime.now().isoformat()
+    }
 
-    audit_data.append(entry)
-    audit_data = audit_data[-max_entries:]
+def make_audit_entry(entry):
+    # Log audit to both server.log and audit_log.json (missing IP address)
+    return {
+        "timestamp": entry["submitted"],
+        "user_id": entry["source"],
+        "destination": entry["destination"],
+        "amount": entry["amount"],
+        "note": "No IP address recorded"
+    }
 
-    with open(AUDIT_LOG_JSON, "w") as f:
-        json.dump(audit_data, f, indent=2)
+def history_page(args):
+    # Filters and cursor come from the query string, e.g. /?account=123-001&cursor=40
+    limit = min(max(args.get("limit", 20, type=int), 1), 200)
+    filters = {name: args.get(name) or None for name in ("account", "start", "end")}
+    transfers, next_cursor = history.page(cursor=args.get("cursor", type=int), limit=limit, **filters)
+    return {"transfers": transfers, "next_cursor": next_cursor, "filters": filters, "limit": limit}
+
+def read_batch_rows(req):
+    # JSON: a list of transfers or {"transfers": [...]}; otherwise CSV with a
+    # source,destination,amount,date header, uploaded as "file" or sent as the body.
+    # Returns None if the JSON is not a list of objects
+    if req.is_json:
+        data = req.get_json()
+        rows = data.get("transfers", []) if isinstance(data, dict) else data
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            return None
+        return rows
+    upload = req.files.get("file")
+    text = upload.read().decode("utf-8") if upload else req.get_data(as_text=True)
+    return list(csv.DictReader(io.StringIO(text)))
 
 
 @app.route("/")
 def home():
     accounts = load_accounts()
     logging.info("Visited Home Page")
-    return render_template("home.html", transfers=load_transfers(), accounts=accounts, today=date.today().isoformat())
+    return render_template("home.html", accounts=accounts, today=date.today().isoformat(), **history_page(request.args))
 
 @app.route("/transfer", methods=["GET", "POST"])
 def transfer():
@@ -77,52 +154,74 @@ def transfer():
         amount = float(request.form["amount"])
         trans_date = request.form["date"]
 
-        logging.info(f"Transfer request from {src} to {dest} for ${amount} on {trans_date}")
-
-        if random.random() < 0.1:
-            error = "Unable to process, please try again"
-            logging.warning("Simulated network failure during transfer")
-        elif src == dest:
-            error = "Source and destination accounts must be different."
-            logging.warning("Transfer failed: same source and destination")
-        elif src not in accounts:
-            error = "Invalid source account."
-            logging.error("Invalid source account used")
-        elif dest not in accounts:
-            error = "Account not found"
-            logging.error("Destination account not found")
-        elif amount <= 0:
-            error = "Amount must be greater than 0."
-            logging.warning("Transfer failed: amount <= 0")
-        elif accounts[src]["balance"] < amount:
-            error = "Insufficient funds"
-            logging.warning("Transfer failed: insufficient funds")
-        else:
-            accounts[src]["balance"] -= amount
-            accounts[dest]["balance"] += amount
-            save_accounts(accounts)
-            entry = {
-                "source": src,
-                "destination": dest,
-                "amount": amount,
-                "date": trans_date,
-                "submitted": datetime.now().isoformat()
-            }
-            save_transfer(entry)
+        logging.info("Transfer request from %s to %s for $%s on %s", src, dest, amount, trans_date)
 
-            # Log audit to both server.log and audit_log.json (missing IP address)
-            audit_entry = {
-                "timestamp": entry["submitted"],
-                "user_id": src,
-                "destination": dest,
-                "amount": amount,
-                "note": "No IP address recorded"
-            }
+        try:
+            engine.transfer(src, dest, amount)
+        except TransferError as e:
+            error = str(e)
+        if error is None:
+            entry = make_transfer_entry(src, dest, amount, trans_date)
+            save_transfer(entry)
+            audit_entry = make_audit_entry(entry)
             append_audit_log(audit_entry)
-            logging.info(f"Audit Log Entry: {audit_entry}")
-            
+            logging.info("Audit Log Entry: %s", audit_entry)
+
             return redirect(f"/confirmation/{src}/{dest}/{amount}/{trans_date}")
-    return render_template("transfer.html", accounts=accounts, error=error, today=date.today().isoformat())
+    return render_template("transfer.html", accounts=accounts, error=error, today=date.today().isoformat(), **history_page(request.args))
+
+@app.route("/transfer/batch", methods=["POST"])
+def transfer_batch():
+    rows = read_batch_rows(request)
+    if rows is None:
+        return jsonify({"error": "Expected a JSON list of transfer objects"}), 400
+    atomic = request.args.get("atomic", "true").lower() != "false"
+    logging.info("Batch transfer request with %d transfers (atomic=%s)", len(rows), atomic)
+
+    parsed = []
+    errors = []
+    for row in rows:
+        try:
+            if not isinstance(row["source"], str) or not isinstance(row["destination"], str):
+                raise TypeError("Account ids must be strings")
+            parsed.append((row["source"], row["destination"], float(row["amount"])))
+            errors.append(None)
+        except (KeyError, TypeError, ValueError):
+            parsed.append(None)
+            errors.append("Invalid transfer row")
+
+    if not (atomic and any(errors)):
+        valid = [i for i, transfer in enumerate(parsed) if transfer is not None]
+        try:
+            outcome = engine.transfer_many([parsed[i] for i in valid], atomic=atomic)
+        except TransferError as e:
+            return jsonify({"atomic": atomic, "applied": 0, "error": str(e)}), 503
+        for i, error in zip(valid, outcome):
+            errors[i] = error
+
+    applied = [] if atomic and any(errors) else [i for i, error in enumerate(errors) if error is None]
+    entries = [make_transfer_entry(*parsed[i], rows[i].get("date") or date.today().isoformat()) for i in applied]
+    # One journal write per store for the whole batch
+    transfer_store.extend(entries)
+    for entry in entries:
+        append_audit_log(make_audit_entry(entry))
+
+    results = []
+    for i, error in enumerate(errors):
+        if error is not None:
+            results.append({"index": i, "status": "error", "error": error})
+        else:
+            results.append({"index": i, "status": "ok" if not (atomic and any(errors)) else "skipped"})
+    status = 422 if atomic and any(errors) else 200
+    return jsonify({"atomic": atomic, "applied": len(applied), "results": results}), status
+
+@app.route("/audit/stats")
+def audit_stats():
+    return jsonify({"audit": audit_pipeline.stats(), "log_records_dropped": log_handler.dropped})
+
+@app.route("/faults/stats")
+def fault_stats():
+    return jsonify(faults.stats())
 
 @app.route("/confirmation/<source>/<destination>/<amount>/<date>")
 def confirmation(source, destination, amount, date):
@@ -0,0 +1,219 @@
+"""Latency/throughput benchmark for the bank-transfer app.
+
+Seeds a temporary data directory with N accounts and M past transfers,
+then drives each endpoint in turn at the given concurrency and reports
+p50/p95/p99 latency, requests per second and bytes written per request.
+
+    python benchmark.py --accounts 1000 --history 50000 --requests 500 --concurrency 8
+    python benchmark.py --storage json --server     # old storage, real HTTP server
+    python benchmark.py --fault-rate 0.1 --retries 3  # cost of retrying failed transfers
+"""
+import argparse, http.client, json, os, random, sys, tempfile, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+ENDPOINTS = ["home", "transfer_get", "transfer_post", "confirmation"]
+
+
+def seed_data(data_dir, accounts, history, seed):
+    rng = random.Random(seed)
+    account_ids = [f"{100 + i // 1000:03d}-{i % 1000:03d}" for i in range(accounts)]
+    with open(os.path.join(data_dir, "accounts.json"), "w") as f:
+        json.dump({a: {"name": f"Customer {a}", "balance": 1_000_000.0} for a in account_ids}, f, indent=2)
+    transfers = []
+    for i in range(history):
+        src, dest = rng.sample(account_ids, 2)
+        transfers.append({
+            "source": src,
+            "destination": dest,
+            "amount": float(rng.randint(1, 500)),
+            "date": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "submitted": f"2025-01-01T00:00:{i % 60:02d}"
+        })
+    # Written in the original JSON array format; the journal backend migrates it on startup
+    with open(os.path.join(data_dir, "transfers.json"), "w") as f:
+        json.dump(transfers, f, indent=2)
+    return account_ids
+
+
+def written_bytes():
+    # Bytes this process passed to write() so far (Linux only)
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+
+
+class TestClientDriver:
+    def __init__(self, app):
+        self.app = app
+        self.local = threading.local()
+
+    def request(self, method, path, form=None):
+        if not hasattr(self.local, "client"):
+            self.local.client = self.app.test_client()
+        response = self.local.client.open(path, method=method, data=form)
+        return response.status_code, len(response.data)
+
+
+class HttpDriver:
+    def __init__(self, app):
+        from socketserver import ThreadingMixIn
+        from wsgiref.simple_server import WSGIServer, WSGIRequestHandler, make_server
+
+        class ThreadingServer(ThreadingMixIn, WSGIServer):
+            daemon_threads = True
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_message(self, *args):
+                pass
+
+        self.server = make_server("127.0.0.1", 0, app, server_class=ThreadingServer, handler_class=QuietHandler)
+        self.port = self.server.server_port
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.local = threading.local()
+
+    def request(self, method, path, form=None):
+        if not hasattr(self.local, "conn"):
+            self.local.conn = http.client.HTTPConnection("127.0.0.1", self.port)
+        body = urlencode(form) if form else None
+        headers = {"Content-Type": "application/x-www-form-urlencoded"} if form else {}
+        try:
+            self.local.conn.request(method, path, body=body, headers=headers)
+            response = self.local.conn.getresponse()
+        except (http.client.HTTPException, OSError):
+            self.local.conn.close()
+            del self.local.conn
+            raise
+        data = response.read()
+        if response.getheader("Connection", "").lower() == "close" or response.version == 10:
+            self.local.conn.close()
+            del self.local.conn
+        return response.status, len(data)
+
+
+def make_request(endpoint, account_ids, rng):
+    src, dest = rng.sample(account_ids, 2)
+    if endpoint == "home":
+        return "GET", "/", None
+    if endpoint == "transfer_get":
+        return "GET", "/transfer", None
+    if endpoint == "transfer_post":
+        return "POST", "/transfer", {"source": src, "destination": dest, "amount": "1.00", "date": "2025-06-01"}
+    return "GET", f"/confirmation/{src}/{dest}/1.0/2025-06-01", None
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_endpoint(app_module, driver, endpoint, account_ids, requests, concurrency, seed, retries):
+    rngs = threading.local()
+    latencies = []
+    failures = []
+    response_bytes = []
+    attempts = []
+
+    def one(i):
+        if not hasattr(rngs, "rng"):
+            rngs.rng = random.Random(seed * 7919 + i)
+        method, path, form = make_request(endpoint, account_ids, rngs.rng)
+        start = time.perf_counter()
+        for attempt in range(1, retries + 2):
+            try:
+                status, size = driver.request(method, path, form)
+            except Exception:
+                failures.append(1)
+                return
+            # A POST that re-renders the form instead of redirecting was rejected
+            failed = status >= 400 or (endpoint == "transfer_post" and status != 302)
+            if not failed:
+                break
+        latencies.append(time.perf_counter() - start)
+        response_bytes.append(size)
+        attempts.append(attempt)
+        if failed:
+            failures.append(1)
+
+    injected_before = sum(app_module.faults.injected.values())
+    before = written_bytes()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    # Count the writes the background flushers owe for this phase too
+    app_module.account_repo.flush()
+    app_module.audit_pipeline.join()
+    elapsed = time.perf_counter() - start
+    after = written_bytes()
+
+    latencies.sort()
+    return {
+        "endpoint": endpoint,
+        "requests": requests,
+        "errors": len(failures),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "throughput_rps": requests / elapsed,
+        "attempts_per_request": sum(attempts) / max(len(attempts), 1),
+        "injected_faults": sum(app_module.faults.injected.values()) - injected_before,
+        "response_bytes": sum(response_bytes) / max(len(response_bytes), 1),
+        "written_bytes_per_request": (after - before) / requests if before is not None else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--accounts", type=int, default=100)
+    parser.add_argument("--history", type=int, default=1000, help="transfers already on file")
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--storage", choices=["journal", "json"], default="journal")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS))
+    parser.add_argument("--server", action="store_true", help="go through a local threaded WSGI server")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fault-rate", type=float, default=0.0, help="simulated failure rate for transfers")
+    parser.add_argument("--retries", type=int, default=0, help="times to retry a rejected transfer")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        account_ids = seed_data(data_dir, args.accounts, args.history, args.seed)
+        os.environ["BANK_DATA_DIR"] = data_dir
+        os.environ["BANK_STORAGE"] = args.storage
+        os.environ["BANK_FAULT_RATE"] = str(args.fault_rate)
+        os.environ["BANK_FAULT_SEED"] = str(args.seed)
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        import app as app_module
+
+        driver = HttpDriver(app_module.app) if args.server else TestClientDriver(app_module.app)
+        results = [
+            run_endpoint(app_module, driver, endpoint, account_ids, args.requests, args.concurrency, args.seed, args.retries)
+            for endpoint in args.endpoints.split(",")
+        ]
+        app_module.account_repo.close()
+        app_module.transfer_store.close()
+
+    if args.json:
+        print(json.dumps({"config": vars(args), "results": results}, indent=2))
+        return
+    print(f"storage={args.storage} accounts={args.accounts} history={args.history} "
+          f"concurrency={args.concurrency} driver={'http' if args.server else 'test-client'} "
+          f"fault_rate={args.fault_rate} retries={args.retries}")
+    print(f"{'endpoint':<15}{'reqs':>6}{'errors':>8}{'faults':>8}{'tries':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'req/s':>9}{'resp B':>9}{'written B/req':>15}")
+    for r in results:
+        written = f"{r['written_bytes_per_request']:.0f}" if r["written_bytes_per_request"] is not None else "n/a"
+        print(f"{r['endpoint']:<15}{r['requests']:>6}{r['errors']:>8}{r['injected_faults']:>8}"
+              f"{r['attempts_per_request']:>7.2f}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}"
+              f"{r['p99_ms']:>9.2f}{r['throughput_rps']:>9.0f}{r['response_bytes']:>9.0f}{written:>15}")
+
+
+if __name__ == "__main__":
+    main()
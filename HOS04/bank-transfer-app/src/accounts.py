@@ -0,0 +1,101 @@
+import json, os, threading
+
+
+class AccountRepository:
+    """Keeps accounts.json in memory and writes changed accounts back lazily.
+
+    The file is re-read only when its mtime/size changes underneath us.
+    Updates mark accounts dirty; dirty accounts are written together after
+    `flush_interval` seconds (0 writes through immediately) using a temp
+    file and an atomic rename, in the same indented JSON format as before.
+    """
+
+    def __init__(self, path, flush_interval=0.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._lock = threading.RLock()
+        self._accounts = {}
+        self._dirty = set()
+        self._stamp = None
+        self._timer = None
+        self._load()
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _load(self):
+        stamp = self._stat()
+        accounts = {}
+        if stamp is not None:
+            with open(self.path, "r") as f:
+                accounts = json.load(f)
+        # Changes we have not written yet win over what is on disk
+        for account_id in self._dirty:
+            accounts[account_id] = self._accounts[account_id]
+        self._accounts = accounts
+        self._stamp = stamp
+
+    def refresh(self):
+        with self._lock:
+            if self._stat() != self._stamp:
+                self._load()
+
+    def reload(self):
+        with self._lock:
+            self._load()
+
+    def all(self):
+        with self._lock:
+            self.refresh()
+            return {account_id: dict(account) for account_id, account in self._accounts.items()}
+
+    def get(self, account_id):
+        with self._lock:
+            self.refresh()
+            account = self._accounts.get(account_id)
+            return dict(account) if account is not None else None
+
+    def update(self, accounts):
+        with self._lock:
+            self.refresh()
+            for account_id, account in accounts.items():
+                if self._accounts.get(account_id) != account:
+                    self._accounts[account_id] = dict(account)
+                    self._dirty.add(account_id)
+            if self._dirty:
+                self._schedule_flush()
+
+    def _schedule_flush(self):
+        if self.flush_interval <= 0:
+            self._flush()
+        elif self._timer is None:
+            self._timer = threading.Timer(self.flush_interval, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush(self):
+        self._timer = None
+        if not self._dirty:
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._accounts, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._dirty.clear()
+        self._stamp = self._stat()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._flush()
@@ -0,0 +1,109 @@
+import logging, queue, threading
+from logging.handlers import QueueHandler
+
+_STOP = object()
+
+
+class AuditPipeline:
+    """Hands audit entries to a background thread that writes them in batches.
+
+    submit() only puts the entry on a bounded queue. When the queue is full
+    it waits up to `block_timeout` seconds for room (back-pressure) and then
+    drops the entry; drops are counted and reported by stats().
+    """
+
+    def __init__(self, store, max_queue=1000, batch_size=100, block_timeout=0.1):
+        self.store = store
+        self.batch_size = batch_size
+        self.block_timeout = block_timeout
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._counter_lock = threading.Lock()
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    def _count(self, name, n=1):
+        with self._counter_lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    def submit(self, entry):
+        try:
+            if self.block_timeout > 0:
+                self._queue.put(entry, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(entry)
+        except queue.Full:
+            self._count("dropped")
+            return False
+        self._count("enqueued")
+        return True
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size and batch[-1] is not _STOP:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = batch[-1] is _STOP
+            if stop:
+                batch.pop()
+            if batch:
+                try:
+                    self.store.extend(batch)
+                    self._count("written", len(batch))
+                    self._count("batches")
+                except Exception:
+                    self._count("failed", len(batch))
+                    logging.exception("Failed to write %d audit entries", len(batch))
+            for _ in range(len(batch) + stop):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def join(self):
+        """Wait until every queued entry has been written."""
+        self._queue.join()
+
+    def stats(self):
+        with self._counter_lock:
+            return {
+                "queued": self._queue.qsize(),
+                "capacity": self._queue.maxsize,
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "batches": self.batches,
+                "dropped": self.dropped,
+                "failed": self.failed,
+            }
+
+    def close(self, timeout=5.0):
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler for a bounded queue that counts records it had to drop.
+
+    Records are queued unformatted; the QueueListener thread does the
+    formatting, so the request thread only pays for the put.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
@@ -0,0 +1,118 @@
+import logging, math, threading
+from contextlib import contextmanager
+from src.filelock import FileLock
+
+
+class TransferError(Exception):
+    pass
+
+
+class TransferEngine:
+    """Moves money between accounts in an AccountRepository.
+
+    In "thread" mode each account has its own lock and a transfer takes the
+    locks of both accounts in sorted order, so transfers between unrelated
+    accounts run in parallel and two opposite transfers cannot deadlock.
+    In "process" mode a file lock is held as well, and the repository is
+    re-read before and written through after every transfer, so several
+    worker processes can share one accounts.json.
+    """
+
+    def __init__(self, repo, mode="thread", lock_path=None, faults=None):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown lock mode: {mode}")
+        self.repo = repo
+        self.mode = mode
+        self.faults = faults
+        self.lock_path = lock_path or repo.path + ".lock"
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _account_lock(self, account_id):
+        with self._locks_guard:
+            return self._locks.setdefault(account_id, threading.Lock())
+
+    @contextmanager
+    def locked(self, account_ids):
+        locks = [self._account_lock(account_id) for account_id in sorted(set(account_ids))]
+        for lock in locks:
+            lock.acquire()
+        try:
+            if self.mode == "process":
+                with FileLock(self.lock_path):
+                    self.repo.reload()
+                    yield
+                    self.repo.flush()
+            else:
+                yield
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    def _fail(self, error, log_message, level=logging.WARNING):
+        logging.log(level, log_message)
+        raise TransferError(error)
+
+    def _inject_fault(self, endpoint):
+        if self.faults is not None and self.faults.should_fail(endpoint):
+            self._fail("Unable to process, please try again", "Simulated network failure during transfer")
+
+    def _check_request(self, src, dest, amount):
+        if src == dest:
+            self._fail("Source and destination accounts must be different.", "Transfer failed: same source and destination")
+        if self.repo.get(src) is None:
+            self._fail("Invalid source account.", "Invalid source account used", logging.ERROR)
+        if self.repo.get(dest) is None:
+            self._fail("Account not found", "Destination account not found", logging.ERROR)
+        if not math.isfinite(amount):
+            self._fail("Amount must be a number.", "Transfer failed: amount is not finite")
+        if amount <= 0:
+            self._fail("Amount must be greater than 0.", "Transfer failed: amount <= 0")
+
+    def _apply(self, accounts, src, dest, amount):
+        if accounts[src]["balance"] < amount:
+            self._fail("Insufficient funds", "Transfer failed: insufficient funds")
+        accounts[src]["balance"] -= amount
+        accounts[dest]["balance"] += amount
+
+    def transfer(self, src, dest, amount):
+        self._inject_fault("transfer")
+        self._check_request(src, dest, amount)
+        with self.locked([src, dest]):
+            # Balances are only read once both account locks are held
+            accounts = {src: self.repo.get(src), dest: self.repo.get(dest)}
+            self._apply(accounts, src, dest, amount)
+            self.repo.update(accounts)
+
+    def transfer_many(self, transfers, atomic=True):
+        """Run (src, dest, amount) transfers in order under one set of locks.
+
+        Returns one entry per transfer: None if it succeeded, otherwise the
+        error message. With atomic=True nothing is applied unless every
+        transfer succeeds. Changed accounts are handed to the repository in
+        a single update, so they are persisted with one write. An injected
+        fault fails the whole batch with TransferError.
+        """
+        self._inject_fault("transfer_batch")
+        errors = []
+        for src, dest, amount in transfers:
+            try:
+                self._check_request(src, dest, amount)
+                errors.append(None)
+            except TransferError as e:
+                errors.append(str(e))
+
+        account_ids = {account_id for (src, dest, _), error in zip(transfers, errors) if error is None for account_id in (src, dest)}
+        with self.locked(account_ids):
+            accounts = {account_id: self.repo.get(account_id) for account_id in account_ids}
+            for i, (src, dest, amount) in enumerate(transfers):
+                if errors[i] is not None:
+                    continue
+                try:
+                    self._apply(accounts, src, dest, amount)
+                except TransferError as e:
+                    errors[i] = str(e)
+            if atomic and any(error is not None for error in errors):
+                return errors
+            self.repo.update(accounts)
+        return errors
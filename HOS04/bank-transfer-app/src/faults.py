@@ -0,0 +1,59 @@
+import random, threading
+from collections import Counter
+
+
+def parse_rules(text):
+    """Parse "transfer=0.1,transfer_batch=0" into {"transfer": 0.1, "transfer_batch": 0.0}."""
+    rules = {}
+    for part in (text or "").split(","):
+        if part.strip():
+            endpoint, rate = part.split("=")
+            rules[endpoint.strip()] = float(rate)
+    return rules
+
+
+class FaultInjector:
+    """Decides which requests fail on purpose, using a seeded RNG.
+
+    Each endpoint fails with its rate from `rules`, or `rate` if it has no
+    rule. The same seed gives the same sequence of failures, so load tests
+    can be repeated. Checks and injected faults are counted per endpoint.
+    """
+
+    def __init__(self, rate=0.0, seed=None, rules=None, enabled=True):
+        self.rate = rate
+        self.rules = dict(rules or {})
+        self.enabled = enabled
+        self.seed = seed
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.checks = Counter()
+        self.injected = Counter()
+
+    def should_fail(self, endpoint):
+        if not self.enabled:
+            return False
+        rate = self.rules.get(endpoint, self.rate)
+        with self._lock:
+            self.checks[endpoint] += 1
+            if rate > 0 and self._rng.random() < rate:
+                self.injected[endpoint] += 1
+                return True
+        return False
+
+    def reset(self):
+        with self._lock:
+            self._rng = random.Random(self.seed)
+            self.checks.clear()
+            self.injected.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "rate": self.rate,
+                "rules": self.rules,
+                "seed": self.seed,
+                "checks": dict(self.checks),
+                "injected": dict(self.injected),
+            }
@@ -0,0 +1,18 @@
+class FileLock:
+    """Exclusive advisory lock on a file, shared by every process on the host."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        import fcntl  # Unix only, so only imported when process mode is used
+        self._file = open(self.path, "a")
+        fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        import fcntl
+        fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        self._file.close()
+        self._file = None
@@ -0,0 +1,85 @@
+import heapq
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from itertools import islice
+
+UNREADABLE = object()
+
+
+def _newest_below(seqs, cursor):
+    # seqs is sorted ascending; walk it backwards from just below cursor
+    for i in range(bisect_left(seqs, cursor) - 1, -1, -1):
+        yield seqs[i]
+
+
+class TransferHistory:
+    """Indexes a transfer store by source, destination and date.
+
+    The indexes only hold sequence numbers, so a page of history reads just
+    the records it shows. They are updated through the store's listener
+    hook, which runs under the store's own lock.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._build()
+        store.add_listener(self._index)
+
+    def _build(self):
+        self._generation = self.store.generation
+        self._dates = []
+        self._by_source = defaultdict(list)
+        self._by_destination = defaultdict(list)
+        self._by_date = defaultdict(list)
+        self._date_keys = []
+        for seq, record in self.store.records():
+            self._index(seq, record)
+
+    def _index(self, seq, record):
+        while len(self._dates) < seq:
+            self._dates.append(UNREADABLE)
+        trans_date = record.get("date")
+        self._dates.append(trans_date)
+        self._by_source[record.get("source")].append(seq)
+        self._by_destination[record.get("destination")].append(seq)
+        if isinstance(trans_date, str):
+            if trans_date not in self._by_date:
+                insort(self._date_keys, trans_date)
+            self._by_date[trans_date].append(seq)
+
+    def page(self, account=None, start=None, end=None, cursor=None, limit=20):
+        """Return (transfers, next_cursor), newest first.
+
+        `account` matches either side of a transfer, `start`/`end` are
+        inclusive ISO dates and `cursor` is the next_cursor of the previous
+        page. next_cursor is None on the last page.
+        """
+        self.store.refresh()
+        if self.store.generation != self._generation:
+            self._build()
+
+        # A cursor from an older file or typed by hand may be out of range
+        top = len(self._dates) if cursor is None else max(0, min(cursor, len(self._dates)))
+        if account:
+            seqs = heapq.merge(
+                _newest_below(self._by_source.get(account, []), top),
+                _newest_below(self._by_destination.get(account, []), top),
+                reverse=True,
+            )
+        elif start or end:
+            lo = bisect_left(self._date_keys, start) if start else 0
+            hi = bisect_right(self._date_keys, end) if end else len(self._date_keys)
+            seqs = heapq.merge(*(_newest_below(self._by_date[key], top) for key in self._date_keys[lo:hi]), reverse=True)
+        else:
+            seqs = (seq for seq in range(top - 1, -1, -1) if self._dates[seq] is not UNREADABLE)
+
+        if start or end:
+            seqs = (seq for seq in seqs if self._in_range(self._dates[seq], start, end))
+        seqs = list(islice(seqs, limit + 1))
+        next_cursor = seqs[limit - 1] if len(seqs) > limit else None
+        return self.store.read_at(seqs[:limit]), next_cursor
+
+    def _in_range(self, trans_date, start, end):
+        if not isinstance(trans_date, str):
+            return False
+        return (not start or trans_date >= start) and (not end or trans_date <= end)
@@ -0,0 +1,318 @@
+import json, os, threading, time
+from array import array
+from collections import deque
+from contextlib import nullcontext
+from src.filelock import FileLock
+
+
+def migrate_json_array(legacy_path, path):
+    """Copy a legacy JSON array file into a newline-delimited journal.
+
+    The legacy file is left as it is, so it stays usable with the json
+    backend; it is only read again if the journal is removed.
+    """
+    with open(legacy_path, "r") as f:
+        try:
+            records = json.load(f)
+        except json.JSONDecodeError:
+            records = []  # File exists but is empty or corrupt
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class Journal:
+    """Append-only store with one JSON record per line.
+
+    Appends are flushed to the OS immediately but only fsync'ed every
+    `sync_every` records or `sync_interval` seconds. When `max_entries` is
+    set the file is compacted down to the newest entries once it holds
+    twice that many lines.
+
+    Every line gets a sequence number (its position in the file) and the
+    byte offset of each line is kept in memory, so single records can be
+    read back with read_at() without scanning the file. Listeners added
+    with add_listener() are called with (seq, record) for every new line,
+    including lines appended by other processes.
+
+    When several processes append to one journal, pass `lock_path`: appends
+    and compaction then hold that file lock, and a process that finds the
+    file replaced by another's compaction reopens and re-indexes it (and
+    bumps `generation`) before writing.
+    """
+
+    def __init__(self, path, legacy_path=None, max_entries=None, sync_every=10, sync_interval=1.0, lock_path=None):
+        self.path = path
+        self.lock_path = lock_path
+        self.max_entries = max_entries
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.generation = 0  # bumped whenever compaction renumbers the lines
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._offsets = array("q")
+
+        if legacy_path and os.path.exists(legacy_path) and not os.path.exists(path):
+            migrate_json_array(legacy_path, path)
+        self._size = self._repair()
+        self._file = open(path, "ab")
+        self._inode = os.fstat(self._file.fileno()).st_ino
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def _repair(self):
+        # Drop a torn last line left behind by a crash mid-append
+        if not os.path.exists(self.path):
+            return 0
+        good_size = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                self._offsets.append(good_size)
+                good_size += len(line)
+        if good_size != os.path.getsize(self.path):
+            with open(self.path, "r+b") as f:
+                f.truncate(good_size)
+        return good_size
+
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+    def _add(self, line, record):
+        seq = len(self._offsets)
+        self._offsets.append(self._size)
+        self._size += len(line)
+        if record is not None:
+            for listener in self._listeners:
+                listener(seq, record)
+
+    def _shared(self):
+        return FileLock(self.lock_path) if self.lock_path else nullcontext()
+
+    def _reopen(self, f):
+        # Another process compacted the journal into a new file, so our
+        # append handle and offsets belong to the old one. Re-index from
+        # `f`, a handle already open on the new file
+        self._file.close()
+        self._file = open(self.path, "ab")
+        self._inode = os.fstat(self._file.fileno()).st_ino
+        self._offsets = array("q")
+        self._size = 0
+        self._unsynced = 0
+        self.generation += 1
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            self._offsets.append(self._size)
+            self._size += len(line)
+
+    def _scan_tail(self):
+        # Index lines that were appended after the ones we already know
+        with open(self.path, "rb") as f:
+            st = os.fstat(f.fileno())
+            if st.st_ino != self._inode:
+                self._reopen(f)
+                return
+            if st.st_size == self._size:
+                return
+            f.seek(self._size)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # another process is still writing this line
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    record = None
+                self._add(line, record)
+
+    def refresh(self):
+        with self._lock:
+            self._scan_tail()
+
+    def append(self, record):
+        self.extend([record])
+
+    def extend(self, records):
+        records = list(records)
+        if not records:
+            return
+        lines = [(json.dumps(record) + "\n").encode() for record in records]
+        with self._lock, self._shared():
+            self._scan_tail()
+            start = self._size
+            self._file.write(b"".join(lines))
+            self._file.flush()
+            if os.fstat(self._file.fileno()).st_size == start + sum(len(line) for line in lines):
+                for line, record in zip(lines, records):
+                    self._add(line, record)
+            else:
+                self._scan_tail()  # another process appended at the same time
+            self._unsynced += len(records)
+            if self._unsynced >= self.sync_every or time.monotonic() - self._last_sync >= self.sync_interval:
+                self._sync()
+            if self.max_entries and len(self._offsets) >= 2 * self.max_entries:
+                self._compact()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def sync(self):
+        with self._lock:
+            self._sync()
+
+    def records(self):
+        """Yield (seq, record) for every readable line, oldest first."""
+        with open(self.path, "rb") as f:
+            for seq, line in enumerate(f):
+                if seq >= len(self._offsets):
+                    break
+                try:
+                    yield seq, json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+    def _read_lines(self):
+        for _, record in self.records():
+            yield record
+
+    def read_at(self, seqs):
+        records = []
+        with open(self.path, "rb") as f:
+            for seq in seqs:
+                f.seek(self._offsets[seq])
+                records.append(json.loads(f.readline()))
+        return records
+
+    def _compact(self):
+        records = self._read_lines()
+        if self.max_entries:
+            records = deque(records, maxlen=self.max_entries)
+        tmp_path = self.path + ".tmp"
+        offsets = array("q")
+        size = 0
+        with open(tmp_path, "wb") as f:
+            for record in records:
+                line = (json.dumps(record) + "\n").encode()
+                f.write(line)
+                offsets.append(size)
+                size += len(line)
+            f.flush()
+            os.fsync(f.fileno())
+        self._file.close()
+        os.replace(tmp_path, self.path)
+        self._file = open(self.path, "ab")
+        self._inode = os.fstat(self._file.fileno()).st_ino
+        self._offsets = offsets
+        self._size = size
+        self._unsynced = 0
+        self.generation += 1
+
+    def compact(self):
+        with self._lock, self._shared():
+            self._scan_tail()
+            self._compact()
+
+    def __iter__(self):
+        if self.max_entries:
+            return iter(self.read_all())
+        return self._read_lines()
+
+    def read_all(self):
+        if self.max_entries:
+            return list(deque(self._read_lines(), maxlen=self.max_entries))
+        return list(self._read_lines())
+
+    def __len__(self):
+        if self.max_entries:
+            return min(len(self._offsets), self.max_entries)
+        return len(self._offsets)
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._sync()
+                self._file.close()
+
+
+class JsonArrayStore:
+    """The original storage format: the whole history as one JSON array."""
+
+    def __init__(self, path, max_entries=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.generation = 0
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+    def refresh(self):
+        pass
+
+    def records(self):
+        return enumerate(self.read_all())
+
+    def read_at(self, seqs):
+        data = self.read_all()
+        return [data[seq] for seq in seqs]
+
+    def read_all(self):
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, "r") as f:
+            try:
+                return json.load(f)
+            except json.JSONDecodeError:
+                return []
+
+    def __iter__(self):
+        return iter(self.read_all())
+
+    def __len__(self):
+        return len(self.read_all())
+
+    def append(self, record):
+        self.extend([record])
+
+    def extend(self, records):
+        records = list(records)
+        if not records:
+            return
+        with self._lock:
+            data = self.read_all()
+            start = len(data)
+            data += records
+            if self.max_entries:
+                data = data[-self.max_entries:]
+            with open(self.path, "w") as f:
+                json.dump(data, f, indent=2)
+            for i, record in enumerate(records):
+                for listener in self._listeners:
+                    listener(start + i, record)
+
+    def sync(self):
+        pass
+
+    def compact(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def open_store(base_path, backend="journal", max_entries=None, **options):
+    """Open `base_path` + .jsonl (journal) or + .json (json), migrating old data."""
+    if backend == "journal":
+        return Journal(base_path + ".jsonl", legacy_path=base_path + ".json", max_entries=max_entries, **options)
+    if backend == "json":
+        return JsonArrayStore(base_path + ".json", max_entries=max_entries)
+    raise ValueError(f"Unknown storage backend: {backend}")
@@ -0,0 +1,85 @@
+"""Hammer the transfer engine from many threads/processes and check that no
+money is created or destroyed.
+
+    python stress_test.py --threads 8
+    python stress_test.py --mode process --processes 4 --threads 2
+"""
+import argparse, json, logging, multiprocessing, os, random, tempfile, threading, time
+from src.accounts import AccountRepository
+from src.engine import TransferEngine, TransferError
+
+
+def seed_accounts(path, count, balance):
+    accounts = {f"acc-{i:05d}": {"name": f"Account {i}", "balance": balance} for i in range(count)}
+    with open(path, "w") as f:
+        json.dump(accounts, f, indent=2)
+    return list(accounts)
+
+
+def run_worker(path, mode, account_ids, transfers, threads, seed):
+    logging.disable(logging.CRITICAL)  # rejected transfers are expected here
+    repo = AccountRepository(path, flush_interval=0.0)
+    engine = TransferEngine(repo, mode=mode)
+    rejected = []
+
+    def work(worker_seed):
+        rng = random.Random(worker_seed)
+        for _ in range(transfers):
+            src, dest = rng.sample(account_ids, 2)
+            try:
+                engine.transfer(src, dest, rng.randint(1, 50))
+            except TransferError:
+                rejected.append(1)
+
+    workers = [threading.Thread(target=work, args=(seed * 1000 + i,)) for i in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    repo.close()
+    return len(rejected)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=["thread", "process"], default="thread")
+    parser.add_argument("--accounts", type=int, default=20)
+    parser.add_argument("--balance", type=int, default=100)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--transfers", type=int, default=500, help="transfers per thread")
+    args = parser.parse_args()
+
+    if args.mode == "thread" and args.processes > 1:
+        parser.error("--processes > 1 needs --mode process")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "accounts.json")
+        account_ids = seed_accounts(path, args.accounts, args.balance)
+        expected_total = args.accounts * args.balance
+
+        start = time.perf_counter()
+        if args.processes > 1:
+            with multiprocessing.Pool(args.processes) as pool:
+                rejected = sum(pool.starmap(run_worker, [
+                    (path, args.mode, account_ids, args.transfers, args.threads, p)
+                    for p in range(args.processes)
+                ]))
+        else:
+            rejected = run_worker(path, args.mode, account_ids, args.transfers, args.threads, 0)
+        elapsed = time.perf_counter() - start
+
+        with open(path) as f:
+            balances = [a["balance"] for a in json.load(f).values()]
+
+    attempted = args.transfers * args.threads * args.processes
+    total = sum(balances)
+    print(f"{attempted} transfers ({rejected} rejected) in {elapsed:.2f}s = {attempted / elapsed:.0f}/s")
+    print(f"total balance {total} (expected {expected_total}), lowest balance {min(balances)}")
+    if total != expected_total or min(balances) < 0:
+        raise SystemExit("FAILED: balances were corrupted")
+    print("OK: total balance conserved and no account overdrawn")
+
+
+if __name__ == "__main__":
+    main()
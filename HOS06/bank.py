@@ -1,19 +1,47 @@
+from ledger import AccountLedger, MESSAGES, OK
+
+
 class BankAccount:
     DAILY_LIMIT = 25000
     TRANSACTION_LIMIT = 10000
 
-    def __init__(self, balance):
-        self.balance = balance
-        self.daily_transferred = 0
+    # The account's numbers live in one row of an AccountLedger, so many
+    # accounts can share a ledger and be processed together.
+    def __init__(self, balance, ledger=None):
+        self.ledger = ledger if ledger is not None else AccountLedger(capacity=1)
+        self.row = self.ledger.add_account(balance, self.DAILY_LIMIT, self.TRANSACTION_LIMIT)
+
+    @property
+    def balance(self):
+        return float(self.ledger.balances[self.row])
+
+    @balance.setter
+    def balance(self, value):
+        self.ledger.balances[self.row] = value
+
+    @property
+    def daily_transferred(self):
+        return self.ledger.daily.total(self.row)
+
+    @daily_transferred.setter
+    def daily_transferred(self, value):
+        self.ledger.daily.set(self.row, value)
 
     def transfer(self, amount):
-        if amount > self.TRANSACTION_LIMIT:
-            raise ValueError("Transfer exceeds per-transaction limit.")
-        if self.daily_transferred + amount > self.DAILY_LIMIT:
-            raise ValueError("Transfer exceeds daily transfer limit.")
-        if amount > self.balance:
-            raise ValueError("Insufficient funds.")
-
-        self.balance -= amount
-        self.daily_transferred += amount
-        return True
\ No newline at end of file
+        code = self.ledger.apply_one(self.row, amount)
+        if code != OK:
+            raise ValueError(MESSAGES[code])
+        return True
+
+    def transfer_many(self, amounts, atomic=True):
+        # Checks every amount in one pass against the running totals.
+        # atomic=True applies all of them or raises without changing anything;
+        # atomic=False applies the valid ones and returns True or the error
+        # message for each amount.
+        rows = [self.row] * len(amounts)
+        if atomic:
+            for i, code in enumerate(self.ledger.check(rows, amounts)):
+                if code != OK:
+                    raise ValueError(f"Transfer {i}: {MESSAGES[code]}")
+        codes = self.ledger.apply(rows, amounts)
+        return [True if code == OK else MESSAGES[code] for code in codes]
@@ -0,0 +1,191 @@
+import time
+
+import numpy as np
+
+from limits import DailyLimitTracker
+
+OK = 0
+EXCEEDS_TRANSACTION_LIMIT = 1
+EXCEEDS_DAILY_LIMIT = 2
+INSUFFICIENT_FUNDS = 3
+
+# Vectorized rounds before _evaluate finishes the rest one by one; every
+# round only settles the first failure per account
+MAX_ROUNDS = 4
+
+MESSAGES = {
+    EXCEEDS_TRANSACTION_LIMIT: "Transfer exceeds per-transaction limit.",
+    EXCEEDS_DAILY_LIMIT: "Transfer exceeds daily transfer limit.",
+    INSUFFICIENT_FUNDS: "Insufficient funds.",
+}
+
+
+def group_cumsum(values, starts, long_group=64):
+    """Running sums of `values` that restart wherever `starts` is True.
+
+    Each sum only adds values from its own group, so a large total in
+    another group cannot round away small amounts the way one cumsum over
+    everything does. Groups longer than `long_group` get one cumsum each;
+    the rest are summed together by doubling the reach every step.
+    """
+    n = len(values)
+    sums = values.copy()
+    heads = np.flatnonzero(starts)
+    lengths = np.diff(np.r_[heads, n])
+    long = lengths > long_group
+    for head, length in zip(heads[long].tolist(), lengths[long].tolist()):
+        sums[head:head + length] = np.cumsum(values[head:head + length])
+    group_start = np.repeat(heads, lengths)
+    positions = np.arange(n)
+    reach = np.flatnonzero((positions > group_start) & np.repeat(~long, lengths))
+    step = 1
+    while len(reach):
+        sums[reach] += sums[reach - step]
+        step *= 2
+        reach = reach[reach - step >= group_start[reach]]
+    return sums
+
+
+class AccountLedger:
+    """Balances, daily totals and limits of many accounts stored as columns.
+
+    Each account is a row index. apply() takes arrays of rows and amounts
+    and returns one result code per transfer (OK or one of the error codes
+    above), giving the same answers as calling BankAccount.transfer() for
+    each transfer in order. Daily totals are kept by a DailyLimitTracker,
+    so `window` and `clock` decide when the daily limit starts over.
+    """
+
+    def __init__(self, capacity=16, window="calendar", clock=time.time):
+        self._size = 0
+        self._balances = np.zeros(capacity)
+        self.daily = DailyLimitTracker(capacity, window=window, clock=clock)
+        self._daily_limits = np.zeros(capacity)
+        self._transaction_limits = np.zeros(capacity)
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def balances(self):
+        return self._balances[:self._size]
+
+    @property
+    def daily_transferred(self):
+        return self.daily.totals()
+
+    @property
+    def daily_limits(self):
+        return self._daily_limits[:self._size]
+
+    @property
+    def transaction_limits(self):
+        return self._transaction_limits[:self._size]
+
+    def _grow(self, needed):
+        capacity = max(needed, 2 * len(self._balances))
+        for name in ("_balances", "_daily_limits", "_transaction_limits"):
+            column = np.zeros(capacity)
+            column[:self._size] = getattr(self, name)[:self._size]
+            setattr(self, name, column)
+
+    def add_accounts(self, balances, daily_limit, transaction_limit):
+        balances = np.asarray(balances, dtype=float)
+        start = self._size
+        end = start + len(balances)
+        if end > len(self._balances):
+            self._grow(end)
+        self._balances[start:end] = balances
+        self.daily.add_rows(len(balances))
+        self._daily_limits[start:end] = daily_limit
+        self._transaction_limits[start:end] = transaction_limit
+        self._size = end
+        return np.arange(start, end)
+
+    def add_account(self, balance, daily_limit, transaction_limit):
+        return int(self.add_accounts([balance], daily_limit, transaction_limit)[0])
+
+    def check_one(self, row, amount, now=None):
+        if amount > self._transaction_limits[row]:
+            return EXCEEDS_TRANSACTION_LIMIT
+        if self.daily.total(row, now) + amount > self._daily_limits[row]:
+            return EXCEEDS_DAILY_LIMIT
+        if amount > self._balances[row]:
+            return INSUFFICIENT_FUNDS
+        return OK
+
+    def apply_one(self, row, amount):
+        now = self.daily.clock()
+        code = self.check_one(row, amount, now)
+        if code == OK:
+            self._balances[row] -= amount
+            self.daily.add([row], [amount], now)
+        return code
+
+    def _evaluate(self, rows, amounts, now):
+        # Returns the result codes and the accepted amount per row.
+        #
+        # Transfers from the same row depend on each other, so the pending
+        # ones are grouped by row and checked with running sums. In every
+        # group the transfers before the first failure are accepted, the
+        # failing one is rejected and the rest are checked again in the
+        # next round without it. An account that keeps failing would need
+        # one round per failure, so after MAX_ROUNDS the leftovers are
+        # checked in a plain loop instead.
+        rows = np.asarray(rows, dtype=np.intp)
+        amounts = np.asarray(amounts, dtype=float)
+        codes = np.full(len(rows), OK, dtype=np.int8)
+        spent = np.zeros(self._size)
+        daily = self.daily.totals(now=now)
+
+        codes[amounts > self._transaction_limits[rows]] = EXCEEDS_TRANSACTION_LIMIT
+        pending = np.flatnonzero(codes == OK)
+        for _ in range(MAX_ROUNDS):
+            if not len(pending):
+                break
+            order = pending[np.argsort(rows[pending], kind="stable")]
+            r = rows[order]
+            a = amounts[order]
+            n = len(order)
+            positions = np.arange(n)
+            starts = np.r_[True, r[1:] != r[:-1]]
+            total = spent[r] + group_cumsum(a, starts)
+
+            daily_fail = daily[r] + total > self._daily_limits[r]
+            funds_fail = total > self._balances[r]
+            failed = daily_fail | funds_fail
+            if not failed.any():
+                np.add.at(spent, r, a)
+                pending = pending[:0]
+                break
+
+            first_fail = np.minimum.reduceat(np.where(failed, positions, n), np.flatnonzero(starts))
+            first_fail = first_fail[np.cumsum(starts) - 1]
+            accepted = positions < first_fail
+            rejected = positions == first_fail
+            np.add.at(spent, r[accepted], a[accepted])
+            codes[order[rejected]] = np.where(daily_fail[rejected], EXCEEDS_DAILY_LIMIT, INSUFFICIENT_FUNDS)
+            pending = np.sort(order[positions > first_fail])
+
+        daily_limits = self._daily_limits
+        balances = self._balances
+        for i, row, amount in zip(pending.tolist(), rows[pending].tolist(), amounts[pending].tolist()):
+            total = spent[row] + amount
+            if daily[row] + total > daily_limits[row]:
+                codes[i] = EXCEEDS_DAILY_LIMIT
+            elif total > balances[row]:
+                codes[i] = INSUFFICIENT_FUNDS
+            else:
+                spent[row] = total
+        return codes, spent
+
+    def check(self, rows, amounts):
+        return self._evaluate(rows, amounts, self.daily.clock())[0]
+
+    def apply(self, rows, amounts):
+        now = self.daily.clock()
+        codes, spent = self._evaluate(rows, amounts, now)
+        self._balances[:self._size] -= spent
+        changed = np.flatnonzero(spent)
+        self.daily.add(changed, spent[changed], now)
+        return codes
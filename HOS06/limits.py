@@ -0,0 +1,76 @@
+import time
+from datetime import date
+
+import numpy as np
+
+
+class DailyLimitTracker:
+    """Amount transferred per account row in the current daily window.
+
+    window="calendar" counts since local midnight (one bucket per row,
+    keyed by the day). window="rolling" counts the last 24 hours in
+    `buckets` time slots per row; a slot is cleared when the clock reaches
+    it again, so nothing ever has to be rebuilt as days go by. Reads and
+    updates touch at most `buckets` numbers per row.
+    """
+
+    DAY_SECONDS = 24 * 60 * 60
+
+    def __init__(self, capacity=16, window="calendar", buckets=24, clock=time.time):
+        if window not in ("calendar", "rolling"):
+            raise ValueError(f"Unknown window: {window}")
+        self.window = window
+        self.buckets = 1 if window == "calendar" else buckets
+        self.bucket_seconds = self.DAY_SECONDS / self.buckets
+        self.clock = clock
+        self._size = 0
+        self._amounts = np.zeros((capacity, self.buckets))
+        self._keys = np.full((capacity, self.buckets), -1, dtype=np.int64)
+
+    def __len__(self):
+        return self._size
+
+    def current_key(self, now=None):
+        now = self.clock() if now is None else now
+        if self.window == "calendar":
+            return date.fromtimestamp(now).toordinal()
+        return int(now // self.bucket_seconds)
+
+    def add_rows(self, count):
+        end = self._size + count
+        if end > len(self._amounts):
+            capacity = max(end, 2 * len(self._amounts))
+            amounts = np.zeros((capacity, self.buckets))
+            keys = np.full((capacity, self.buckets), -1, dtype=np.int64)
+            amounts[:self._size] = self._amounts[:self._size]
+            keys[:self._size] = self._keys[:self._size]
+            self._amounts, self._keys = amounts, keys
+        self._amounts[self._size:end] = 0
+        self._keys[self._size:end] = -1
+        self._size = end
+
+    def totals(self, rows=None, now=None):
+        key = self.current_key(now)
+        rows = np.arange(self._size) if rows is None else np.asarray(rows, dtype=np.intp)
+        live = self._keys[rows] > key - self.buckets
+        return (self._amounts[rows] * live).sum(axis=1)
+
+    def total(self, row, now=None):
+        key = self.current_key(now)
+        return float(self._amounts[row][self._keys[row] > key - self.buckets].sum())
+
+    def add(self, rows, amounts, now=None):
+        key = self.current_key(now)
+        slot = key % self.buckets
+        rows = np.asarray(rows, dtype=np.intp)
+        stale = rows[self._keys[rows, slot] != key]
+        self._amounts[stale, slot] = 0
+        self._keys[stale, slot] = key
+        np.add.at(self._amounts[:, slot], rows, amounts)
+
+    def set(self, row, amount, now=None):
+        key = self.current_key(now)
+        self._amounts[row] = 0
+        self._keys[row] = -1
+        self._amounts[row, key % self.buckets] = amount
+        self._keys[row, key % self.buckets] = key
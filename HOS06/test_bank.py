@@ -21,3 +21,25 @@ def test_insufficient_funds():
     account = BankAccount(5000)
     with pytest.raises(ValueError, match="Insufficient funds"):
         account.transfer(6000)
+
+def test_transfer_many():
+    account = BankAccount(30000)
+    assert account.transfer_many([5000, 5000, 2500]) == [True, True, True]
+    assert account.balance == 17500
+    assert account.daily_transferred == 12500
+
+def test_transfer_many_atomic_rolls_back():
+    account = BankAccount(8000)
+    with pytest.raises(ValueError, match="Transfer 2: Insufficient funds"):
+        account.transfer_many([3000, 3000, 3000])
+    assert account.balance == 8000
+    assert account.daily_transferred == 0
+
+def test_transfer_many_per_item_results():
+    account = BankAccount(50000)
+    results = account.transfer_many([9000, 15000, 9000, 9000], atomic=False)
+    assert results[0] == True
+    assert "per-transaction limit" in results[1]
+    assert results[2] == True
+    assert "daily transfer limit" in results[3]
+    assert account.balance == 32000
@@ -0,0 +1,72 @@
+from bank import BankAccount
+from ledger import AccountLedger, MESSAGES, OK, EXCEEDS_TRANSACTION_LIMIT, EXCEEDS_DAILY_LIMIT, INSUFFICIENT_FUNDS
+import numpy as np
+
+def test_apply_batch_result_codes():
+    ledger = AccountLedger()
+    rows = ledger.add_accounts([30000, 5000, 50000], 25000, 10000)
+    codes = ledger.apply(rows, [5000, 6000, 15000])
+    assert list(codes) == [OK, INSUFFICIENT_FUNDS, EXCEEDS_TRANSACTION_LIMIT]
+    assert list(ledger.balances) == [25000, 5000, 50000]
+
+def test_apply_batch_matches_sequential_transfers():
+    rng = np.random.default_rng(0)
+    balances = rng.integers(0, 30000, 50)
+    rows = rng.integers(0, 50, 2000)
+    amounts = rng.integers(1, 12000, 2000)
+
+    batch = AccountLedger()
+    batch.add_accounts(balances, 25000, 10000)
+    codes = batch.apply(rows, amounts)
+
+    sequential = AccountLedger()
+    sequential.add_accounts(balances, 25000, 10000)
+    expected = [sequential.apply_one(r, a) for r, a in zip(rows, amounts)]
+
+    assert list(codes) == expected
+    assert np.array_equal(batch.balances, sequential.balances)
+    assert np.array_equal(batch.daily_transferred, sequential.daily_transferred)
+
+def test_check_does_not_change_ledger():
+    ledger = AccountLedger()
+    ledger.add_accounts([1000], 25000, 10000)
+    assert list(ledger.check([0, 0], [600, 600])) == [OK, INSUFFICIENT_FUNDS]
+    assert ledger.balances[0] == 1000
+
+def test_accounts_are_views_over_a_shared_ledger():
+    ledger = AccountLedger(capacity=1)
+    accounts = [BankAccount(100 * i, ledger) for i in range(1, 40)]
+    accounts[3].transfer(150)
+    assert ledger.balances[accounts[3].row] == 250
+    assert np.array_equal(ledger.balances, [a.balance for a in accounts])
+
+def test_apply_batch_with_repeated_failures_on_one_account():
+    # Every amount after the first fails; this used to take one round each
+    amounts = [600] * 16000
+    account = BankAccount(1000)
+    results = account.transfer_many(amounts, atomic=False)
+
+    sequential = AccountLedger()
+    row = sequential.add_account(1000, BankAccount.DAILY_LIMIT, BankAccount.TRANSACTION_LIMIT)
+    expected = [sequential.apply_one(row, a) for a in amounts]
+
+    assert results == [True if code == OK else MESSAGES[code] for code in expected]
+    assert account.balance == sequential.balances[row]
+
+def test_apply_batch_running_totals_stay_exact_next_to_large_ones():
+    # Large totals on other accounts must not round away the cents here
+    rng = np.random.default_rng(1)
+    balances = [1e12] * 10 + [100]
+    rows = list(rng.integers(0, 10, 3000)) + [10, 10, 10]
+    amounts = list(rng.uniform(0.9e7, 1.1e7, 3000)) + [33.33, 33.33, 33.34]
+
+    batch = AccountLedger()
+    batch.add_accounts(balances, 1e12, 1e8)
+    codes = batch.apply(rows, amounts)
+
+    sequential = AccountLedger()
+    sequential.add_accounts(balances, 1e12, 1e8)
+    expected = [sequential.apply_one(r, a) for r, a in zip(rows, amounts)]
+
+    assert list(codes) == expected
+    assert list(codes[-3:]) == [OK, OK, OK]
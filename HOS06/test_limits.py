@@ -0,0 +1,49 @@
+from bank import BankAccount
+from ledger import AccountLedger
+from limits import DailyLimitTracker
+from datetime import datetime
+import pytest
+
+class FakeClock:
+    def __init__(self, start):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, hours):
+        self.now += hours * 3600
+
+def test_calendar_window_resets_at_midnight():
+    clock = FakeClock(datetime(2025, 5, 1, 22, 0).timestamp())
+    account = BankAccount(100000, AccountLedger(window="calendar", clock=clock))
+    account.transfer(10000)
+    account.transfer(10000)
+    with pytest.raises(ValueError, match="daily transfer limit"):
+        account.transfer(10000)
+    clock.advance(3)
+    assert account.daily_transferred == 0
+    assert account.transfer(10000) == True
+
+def test_rolling_window_expires_old_buckets():
+    clock = FakeClock(datetime(2025, 5, 1, 9, 0).timestamp())
+    account = BankAccount(100000, AccountLedger(window="rolling", clock=clock))
+    account.transfer(10000)
+    clock.advance(12)
+    account.transfer(10000)
+    clock.advance(11)
+    with pytest.raises(ValueError, match="daily transfer limit"):
+        account.transfer(10000)
+    clock.advance(2)
+    assert account.daily_transferred == 10000
+    assert account.transfer(10000) == True
+
+def test_tracker_runs_for_weeks_without_growing():
+    clock = FakeClock(0)
+    tracker = DailyLimitTracker(window="rolling", buckets=24, clock=clock)
+    tracker.add_rows(3)
+    for _ in range(24 * 21):
+        tracker.add([0, 1, 1], [1, 2, 3])
+        clock.advance(1)
+    assert list(tracker.totals()) == [23, 115, 0]
+    assert tracker._amounts.shape == (16, 24)
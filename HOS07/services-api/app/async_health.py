@@ -0,0 +1,116 @@
+import asyncio
+import time
+import aiohttp
+from app.health import BodySummary, client as threaded_client, default_deadline
+from app.metrics import metrics
+
+# Failures to connect are retried, like urllib3 with read=0 does for the
+# threaded client; errors after connecting are not
+RETRY_ERRORS = (aiohttp.ClientConnectorError, aiohttp.ConnectionTimeoutError)
+
+
+def make_client():
+    """One keep-alive aiohttp session for every probe on the event loop.
+
+    Must be called with the loop running. Follows the threaded client's
+    settings: at most HEALTH_POOL_SIZE connections per host, and
+    HEALTH_RETRIES / HEALTH_BACKOFF in probe().
+    """
+    return aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0, limit_per_host=threaded_client.pool_size))
+
+
+async def fetch(client, svc, timeout):
+    # Same connect and read timeouts as requests' timeout=
+    request_timeout = aiohttp.ClientTimeout(sock_connect=timeout, sock_read=timeout)
+    async with client.get(svc["url"] + svc["health_check"], timeout=request_timeout) as response:
+        result = {"status": response.status}
+        body = BodySummary()
+        if body.wanted:
+            async for chunk in response.content.iter_chunked(min(body.max_bytes, 16384) or 1):
+                if body.feed(chunk):
+                    break
+        result.update(body.result(response.charset))
+    return result
+
+
+async def probe(client, svc, timeout=2, name=None):
+    """Async version of app.health.probe; same result shape and retries."""
+    start = time.perf_counter()
+    for retry in range(threaded_client.retries + 1):
+        if retry:
+            await asyncio.sleep(threaded_client.backoff(retry))
+        try:
+            result = await fetch(client, svc, timeout)
+            break
+        except Exception as e:
+            result = {
+                "status": "unreachable",
+                "error": str(e) or type(e).__name__
+            }
+            if not isinstance(e, RETRY_ERRORS):
+                break
+    result["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    if name is not None:
+        metrics.observe_probe(name, result)
+    return result
+
+
+async def check_all(client, services, concurrency=64, timeout=2, deadline=None):
+    """Probe every service with at most `concurrency` requests in flight.
+
+    Same contract as app.health.check_all, but the probes are tasks on the
+    running loop rather than threads.
+    """
+    if not services:
+        return {}
+    if deadline is None:
+        deadline = default_deadline(timeout)
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one(name, svc):
+        async with limit:
+            return await probe(client, svc, timeout, name)
+
+    tasks = {asyncio.ensure_future(one(name, svc)): name for name, svc in services.items()}
+    done, pending = await asyncio.wait(tasks, timeout=deadline)
+    for task in pending:
+        task.cancel()
+
+    results = {}
+    for task, name in tasks.items():
+        if task in done:
+            results[name] = task.result()
+        else:
+            results[name] = {"status": "timeout", "error": f"No result within {deadline}s deadline"}
+            metrics.observe_probe(name, results[name])
+    return results
+
+
+async def run_scheduler(client, scheduler):
+    """Run a HealthScheduler's background checks as tasks on this loop.
+
+    Same due times, cache and history as HealthScheduler.start(), without
+    its threads; at most scheduler.concurrency probes are in flight.
+    Runs until cancelled.
+    """
+    limit = asyncio.Semaphore(scheduler.concurrency)
+    tasks = set()
+
+    async def check(name, svc):
+        try:
+            async with limit:
+                scheduler.record(name, svc, await probe(client, svc, scheduler.timeout, name))
+        finally:
+            scheduler.finished(name)
+
+    try:
+        while True:
+            due, wait = scheduler.claim_due()
+            for name, svc in due:
+                task = asyncio.ensure_future(check(name, svc))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            await asyncio.sleep(wait)
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,89 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+
+class CountingAdapter(HTTPAdapter):
+    """HTTPAdapter that counts how many new connections its pools open."""
+
+    def __init__(self, *args, **kwargs):
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+        super().__init__(*args, **kwargs)
+
+    def _opened(self):
+        with self._lock:
+            self.connections_opened += 1
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        adapter = self
+
+        class CountingHTTPPool(HTTPConnectionPool):
+            def _new_conn(self):
+                adapter._opened()
+                return super()._new_conn()
+
+        class CountingHTTPSPool(HTTPSConnectionPool):
+            def _new_conn(self):
+                adapter._opened()
+                return super()._new_conn()
+
+        self.poolmanager.pool_classes_by_scheme = {"http": CountingHTTPPool, "https": CountingHTTPSPool}
+
+
+class HealthCheckClient:
+    """One keep-alive requests.Session shared by every health check.
+
+    `pool_hosts` is how many hosts keep a connection pool and `pool_size`
+    how many idle connections each host keeps; it should be at least the
+    number of probes that run against one host at the same time.
+    Connection errors are retried `retries` times with exponential
+    backoff, and so are the HTTP statuses in `retry_statuses`.
+    """
+
+    def __init__(self, pool_hosts=100, pool_size=64, retries=1, backoff_factor=0.2, retry_statuses=()):
+        self.pool_size = pool_size
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        retry = Retry(
+            total=retries,
+            read=0,
+            backoff_factor=backoff_factor,
+            status_forcelist=tuple(retry_statuses),
+            allowed_methods=["GET"],
+            raise_on_status=False
+        )
+        self.adapter = CountingAdapter(pool_connections=pool_hosts, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+        self._lock = threading.Lock()
+        self.requests = 0
+
+    def get(self, url, **kwargs):
+        with self._lock:
+            self.requests += 1
+        return self.session.get(url, **kwargs)
+
+    def backoff(self, retry):
+        """Seconds to wait before retry number `retry` (from 1), as urllib3 does."""
+        return 0 if retry <= 1 else self.backoff_factor * 2 ** (retry - 1)
+
+    def max_duration(self, timeout):
+        """Upper bound in seconds for a GET with `timeout` that keeps failing.
+
+        Every attempt may use the whole timeout, plus the backoff between them.
+        """
+        backoff = sum(self.backoff(retry) for retry in range(1, self.retries + 1))
+        return timeout * (self.retries + 1) + backoff
+
+    def stats(self):
+        opened = self.adapter.connections_opened
+        return {
+            "requests": self.requests,
+            "connections_opened": opened,
+            "reuse_rate": round(1 - opened / self.requests, 3) if self.requests else None
+        }
@@ -1,116 +1,277 @@
-from flask import request
+from flask import request, Response, stream_with_context
 from flask_restx import Namespace, Resource, fields
+from jsonschema import Draft4Validator
+from werkzeug.http import quote_etag
 import json
 import os
-import requests
+import time
+from app.health import check_all, client, default_deadline
+from app.metrics import metrics
+from app.registry import ServiceRegistry
+from app.scheduler import HealthScheduler
 
-ns = Namespace("services", description="Service endpoint configuration")
+ns = Namespace("services", description="Service endpoint configuration", decorators=[metrics.timed])
 CONFIG_FILE = "services.json"
 
 # Preloaded sample data
+SAMPLE_SERVICES = {
+    "auth_service": {
+        "url": "https://example.com/auth",
+        "health_check": "/ping",
+        "env": "production"
+    },
+    "user_service": {
+        "url": "https://example.com/users",
+        "health_check": "/status",
+        "env": "staging"
+    }
+}
+
+registry = ServiceRegistry(CONFIG_FILE, sample=SAMPLE_SERVICES)
+
 def load_services():
-    if not os.path.exists(CONFIG_FILE):
-        sample = {
-            "auth_service": {
-                "url": "https://example.com/auth",
-                "health_check": "/ping",
-                "env": "production"
-            },
-            "user_service": {
-                "url": "https://example.com/users",
-                "health_check": "/status",
-                "env": "staging"
-            }
-        }
-        save_services(sample)
-    with open(CONFIG_FILE, "r") as f:
-        return json.load(f)
-
-def save_services(services):
-    with open(CONFIG_FILE, "w") as f:
-        json.dump(services, f, indent=2)
+    # Read-only snapshot; change services through the registry
+    return registry.snapshot()
 
 service_model = ns.model("Service", {
     "name": fields.String(required=True),
     "url": fields.String(required=True),
     "health_check": fields.String(required=True),
-    "env": fields.String(required=True, enum=["dev", "staging", "production"])
+    "env": fields.String(required=True, enum=["dev", "staging", "production"]),
+    "check_interval": fields.Integer(description="Seconds between background health checks")
 })
 
+# Probes every service in the background; started by run.py (threads) or
+# by asgi.py (asyncio tasks)
+scheduler = HealthScheduler(load_services, default_interval=int(os.environ.get("HEALTH_CHECK_INTERVAL", "30")))
+
+# Fixed routes under /services/ that a service of the same name could not
+# be read through, so those names cannot be used for new services
+RESERVED_NAMES = {"bulk", "export", "check-all", "client-stats"}
+
+def reserved_message(name):
+    return f"'{name}' is reserved by the /services/{name} route"
+
+def service_fields(data):
+    svc = {
+        "url": data["url"],
+        "health_check": data["health_check"],
+        "env": data["env"]
+    }
+    if data.get("check_interval"):
+        svc["check_interval"] = data["check_interval"]
+    return svc
+
+# Seconds clients may reuse a response before revalidating it with its ETag
+CACHE_MAX_AGE = int(os.environ.get("CACHE_MAX_AGE", "0"))
+
+def cache_headers(etag):
+    cache_control = f"max-age={CACHE_MAX_AGE}, must-revalidate" if CACHE_MAX_AGE else "no-cache"
+    return {"ETag": quote_etag(etag), "Cache-Control": cache_control}
+
+def not_modified(etag):
+    # 304 without building the body when the client already has this version
+    if request.if_none_match.contains_weak(etag):
+        return Response(status=304, headers=cache_headers(etag))
+    return None
+
 @ns.route("/")
 class ServiceList(Resource):
+    @ns.doc(params={
+        "env": "Only services in this environment",
+        "host": "Only services whose URL has this host",
+        "offset": "Number of matching services to skip",
+        "limit": "Maximum number of services to return"
+    })
     def get(self):
         """List all services grouped by environment"""
-        services = load_services()
+        etag = registry.etag
+        cached = not_modified(etag)
+        if cached:
+            return cached
+        limit = request.args.get("limit", type=int)
+        total, services = registry.query(
+            env=request.args.get("env"),
+            host=request.args.get("host"),
+            offset=max(request.args.get("offset", 0, type=int), 0),
+            limit=None if limit is None else max(limit, 0)
+        )
         grouped = {"dev": {}, "staging": {}, "production": {}}
-        for name, svc in services.items():
-            grouped[svc["env"]][name] = svc
-        return grouped
+        for name, svc in services:
+            grouped.setdefault(svc["env"], {})[name] = dict(svc)
+        return grouped, 200, dict(cache_headers(etag), **{"X-Total-Count": str(total)})
 
     @ns.expect(service_model)
     def post(self):
         """Add a new service"""
         data = request.json
-        services = load_services()
-        services[data["name"]] = {
-            "url": data["url"],
-            "health_check": data["health_check"],
-            "env": data["env"]
-        }
-        save_services(services)
+        if isinstance(data.get("name"), str) and data["name"] in RESERVED_NAMES:
+            ns.abort(400, reserved_message(data["name"]))
+        registry.put(data["name"], service_fields(data))
         return {"message": "Service added"}, 201
 
+def read_bulk_items():
+    # A JSON array, or NDJSON (one object per line) read from the request stream
+    if request.mimetype in ("application/x-ndjson", "application/jsonl"):
+        return [json.loads(line) for line in request.stream if line.strip()]
+    data = request.get_json()
+    items = data if isinstance(data, list) else data.get("services", [])
+    if not isinstance(items, list):
+        raise ValueError("Expected a list of services")
+    return items
+
+@ns.route("/bulk")
+class ServiceBulk(Resource):
+    @ns.doc(description=(
+        "Body: a JSON array or NDJSON stream of services to add or replace. "
+        'An item like {"name": "x", "delete": true} removes a service instead. '
+        "The names bulk, export, check-all and client-stats are reserved. "
+        "Everything is validated first and then applied and saved in one write; "
+        "if any item is invalid nothing changes."
+    ))
+    def post(self):
+        """Add, replace or delete many services in one transaction"""
+        try:
+            items = read_bulk_items()
+        except (ValueError, AttributeError):
+            ns.abort(400, "Body must be a JSON array or NDJSON")
+        validator = Draft4Validator(service_model.__schema__)
+        errors = {}
+        for i, item in enumerate(items):
+            if not isinstance(item, dict):
+                errors[i] = ["Item must be an object"]
+            elif item.get("delete") is True:
+                if not isinstance(item.get("name"), str):
+                    errors[i] = ["'name' is required to delete a service"]
+            else:
+                problems = [e.message for e in validator.iter_errors(item)]
+                if isinstance(item.get("name"), str) and item["name"] in RESERVED_NAMES:
+                    problems.append(reserved_message(item["name"]))
+                if problems:
+                    errors[i] = problems
+        if errors:
+            return {"message": "Input payload validation failed", "errors": errors}, 400
+
+        def apply(services):
+            counts = {"upserted": 0, "deleted": 0, "missing": []}
+            for item in items:
+                if item.get("delete") is True:
+                    if services.pop(item["name"], None) is None:
+                        counts["missing"].append(item["name"])
+                    else:
+                        counts["deleted"] += 1
+                else:
+                    services[item["name"]] = service_fields(item)
+                    counts["upserted"] += 1
+            return counts
+
+        return registry.mutate(apply)
+
+@ns.route("/export")
+class ServiceExport(Resource):
+    @ns.doc(params={"env": "Only export services in this environment"})
+    def get(self):
+        """Stream every service as NDJSON, one object per line"""
+        _, services = registry.query(env=request.args.get("env"))
+
+        def lines():
+            for name, svc in services:
+                yield json.dumps(dict(svc, name=name)) + "\n"
+
+        return Response(stream_with_context(lines()), mimetype="application/x-ndjson")
+
 @ns.route("/<string:name>")
 @ns.param("name", "Service name")
 class Service(Resource):
     def get(self, name):
         """Get service details"""
+        etag = registry.etag
+        cached = not_modified(etag)
         services = load_services()
         if name in services:
-            return services[name]
+            if cached:
+                return cached
+            return dict(services[name]), 200, cache_headers(etag)
         ns.abort(404, "Service not found")
 
     @ns.expect(service_model)
     def put(self, name):
         """Update service info"""
-        services = load_services()
-        if name not in services:
+        svc = service_fields(request.json)
+
+        def update(services):
+            if name not in services:
+                return False
+            services[name] = svc
+
+        if registry.mutate(update) is False:
             ns.abort(404, "Service not found")
-        data = request.json
-        services[name] = {
-            "url": data["url"],
-            "health_check": data["health_check"],
-            "env": data["env"]
-        }
-        save_services(services)
         return {"message": "Service updated"}
 
     def delete(self, name):
         """Remove a service"""
-        services = load_services()
-        if name in services:
-            del services[name]
-            save_services(services)
+        if registry.delete(name):
             return {"message": "Service deleted"}
         ns.abort(404, "Service not found")
 
 @ns.route("/<string:name>/check")
 @ns.param("name", "Service name")
 class ServiceHealth(Resource):
+    @ns.doc(params={"fresh": "Set to 1 to probe now instead of using the cached result"})
     def get(self, name):
-        """Check health of a service"""
+        """Latest health of a service from the background checker"""
         services = load_services()
         if name not in services:
             ns.abort(404, "Service not found")
         svc = services[name]
-        try:
-            response = requests.get(svc["url"] + svc["health_check"], timeout=2)
-            return {
-                "status": response.status_code,
-                "response": response.text
-            }
-        except Exception as e:
-            return {
-                "status": "unreachable",
-                "error": str(e)
-            }
\ No newline at end of file
+        result = None if request.args.get("fresh") == "1" else scheduler.cached(name, svc)
+        if result is None:
+            scheduler.check_now(name, svc)
+            result = scheduler.cached(name, svc)
+        return result
+
+
+def sweep(services):
+    concurrency = min(max(request.args.get("concurrency", 64, type=int), 1), 512)
+    timeout = request.args.get("timeout", 2, type=float)
+    deadline = request.args.get("deadline", default_deadline(timeout), type=float)
+    start = time.perf_counter()
+    results = check_all(services, concurrency=concurrency, timeout=timeout, deadline=deadline)
+    for name, result in results.items():
+        if result["status"] != "timeout":
+            scheduler.record(name, services[name], result)
+    healthy = sum(1 for r in results.values() if isinstance(r["status"], int) and r["status"] < 400)
+    return {
+        "checked": len(results),
+        "healthy": healthy,
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+        "results": results
+    }
+
+sweep_params = {
+    "concurrency": "Maximum probes in flight (default 64)",
+    "timeout": "Per-probe timeout in seconds (default 2)",
+    "deadline": "Seconds before unfinished probes are reported as timeouts (default: long enough for every retry, plus 1)"
+}
+
+@ns.route("/check-all")
+class ServiceHealthAll(Resource):
+    @ns.doc(params=sweep_params)
+    def get(self):
+        """Check health of all services concurrently"""
+        return sweep(load_services())
+
+@ns.route("/check-all/<string:env>")
+@ns.param("env", "Environment to check")
+class ServiceHealthEnv(Resource):
+    @ns.doc(params=sweep_params)
+    def get(self, env):
+        """Check health of all services in one environment concurrently"""
+        _, services = registry.query(env=env)
+        return sweep(dict(services))
+
+@ns.route("/client-stats")
+class HealthClientStats(Resource):
+    def get(self):
+        """Connection reuse of the shared health-check HTTP client"""
+        return client.stats()
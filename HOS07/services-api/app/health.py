@@ -0,0 +1,129 @@
+import hashlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from app.client import HealthCheckClient
+from app.metrics import metrics
+
+# Shared by every probe so repeated checks reuse connections
+client = HealthCheckClient(
+    pool_hosts=int(os.environ.get("HEALTH_POOL_HOSTS", "100")),
+    pool_size=int(os.environ.get("HEALTH_POOL_SIZE", "64")),
+    retries=int(os.environ.get("HEALTH_RETRIES", "1")),
+    backoff_factor=float(os.environ.get("HEALTH_BACKOFF", "0.2"))
+)
+
+
+# How much of a health check body is read, and what is kept of it:
+# "text" keeps it (decoded), "hash" keeps its size and sha256, "none"
+# stops as soon as the status is known.
+BODY_MAX_BYTES = int(os.environ.get("HEALTH_BODY_MAX_BYTES", "4096"))
+BODY_MODE = os.environ.get("HEALTH_BODY_MODE", "text")
+
+
+class BodySummary:
+    """Keeps at most `max_bytes` of a body, summarized by `mode`."""
+
+    def __init__(self, max_bytes=BODY_MAX_BYTES, mode=BODY_MODE):
+        self.max_bytes = max_bytes
+        self.mode = mode
+        self.digest = hashlib.sha256() if mode == "hash" else None
+        self.chunks = []
+        self.size = 0
+        self.truncated = False
+
+    @property
+    def wanted(self):
+        return self.mode != "none"
+
+    def feed(self, chunk):
+        """Add a chunk; returns True once the cap is reached."""
+        if self.size + len(chunk) > self.max_bytes:
+            chunk = chunk[:self.max_bytes - self.size]
+            self.truncated = True
+        self.size += len(chunk)
+        if self.digest is None:
+            self.chunks.append(chunk)
+        else:
+            self.digest.update(chunk)
+        return self.truncated
+
+    def result(self, encoding=None):
+        if not self.wanted:
+            return {}
+        if self.digest is not None:
+            summary = {"body_bytes": self.size, "body_sha256": self.digest.hexdigest()}
+        else:
+            summary = {"response": b"".join(self.chunks).decode(encoding or "utf-8", errors="replace")}
+        if self.truncated:
+            summary["truncated"] = True
+        return summary
+
+
+def read_body(response, max_bytes=BODY_MAX_BYTES, mode=BODY_MODE):
+    """Stream at most `max_bytes` of the body and summarize it by `mode`.
+
+    Anything past the cap is never read; the connection is closed instead
+    of being returned to the pool.
+    """
+    body = BodySummary(max_bytes, mode)
+    if body.wanted:
+        for chunk in response.iter_content(chunk_size=min(max_bytes, 16384) or 1):
+            if body.feed(chunk):
+                break
+    return body.result(response.encoding)
+
+
+def probe(svc, timeout=2, name=None):
+    """Call a service's health check URL once and describe the outcome.
+
+    Results are recorded in the metrics under `name` when it is given.
+    """
+    start = time.perf_counter()
+    try:
+        with client.get(svc["url"] + svc["health_check"], timeout=timeout, stream=True) as response:
+            result = {"status": response.status_code}
+            result.update(read_body(response))
+    except Exception as e:
+        result = {
+            "status": "unreachable",
+            "error": str(e)
+        }
+    result["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    if name is not None:
+        metrics.observe_probe(name, result)
+    return result
+
+
+def default_deadline(timeout):
+    # Leave room for the client's retries, or every unreachable service
+    # would be reported as a timeout rather than as unreachable
+    return client.max_duration(timeout) + 1
+
+
+def check_all(services, concurrency=64, timeout=2, deadline=None):
+    """Probe every service in `services` on a bounded thread pool.
+
+    Results that are not back within `deadline` seconds (by default the
+    retry budget plus one) are reported with status "timeout" instead of
+    holding up the whole sweep.
+    """
+    if not services:
+        return {}
+    if deadline is None:
+        deadline = default_deadline(timeout)
+    pool = ThreadPoolExecutor(max_workers=min(concurrency, len(services)))
+    # Probes that miss the deadline keep running on their threads, so
+    # results are only recorded here, once each, after the deadline
+    futures = {pool.submit(probe, svc, timeout): name for name, svc in services.items()}
+    done, _ = wait(futures, timeout=deadline)
+    pool.shutdown(wait=False, cancel_futures=True)
+
+    results = {}
+    for future, name in futures.items():
+        if future in done:
+            results[name] = future.result()
+        else:
+            results[name] = {"status": "timeout", "error": f"No result within {deadline}s deadline"}
+        metrics.observe_probe(name, results[name])
+    return results
@@ -0,0 +1,145 @@
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+from flask import request
+from werkzeug.exceptions import HTTPException
+
+# Upper bounds in milliseconds, roughly doubling
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class Histogram:
+    """Counts of observations per bucket, plus their sum and count."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            total += count
+            yield bound, total
+
+
+def outcome(status):
+    """Group a probe status into 2xx/3xx/4xx/5xx, timeout or unreachable."""
+    if isinstance(status, int):
+        return f"{status // 100}xx"
+    return str(status)
+
+
+def _labels(**labels):
+    escaped = (
+        '{}="{}"'.format(key, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in labels.items()
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+class Metrics:
+    """Probe and request measurements, rendered in Prometheus text format.
+
+    Recording only takes a lock around a few integer updates, so it is
+    cheap enough to do on every probe and every request.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.probe_latency = {}
+        self.probe_results = {}
+        self.request_latency = {}
+        self.request_counts = {}
+
+    def observe_probe(self, name, result):
+        key = (name, outcome(result["status"]))
+        with self._lock:
+            self.probe_results[key] = self.probe_results.get(key, 0) + 1
+            if result.get("latency_ms") is not None:
+                histogram = self.probe_latency.get(name)
+                if histogram is None:
+                    histogram = self.probe_latency[name] = Histogram()
+                histogram.observe(result["latency_ms"])
+
+    def observe_request(self, method, route, status, latency_ms):
+        with self._lock:
+            key = (method, route, status)
+            self.request_counts[key] = self.request_counts.get(key, 0) + 1
+            histogram = self.request_latency.get((method, route))
+            if histogram is None:
+                histogram = self.request_latency[(method, route)] = Histogram()
+            histogram.observe(latency_ms)
+
+    def forget(self, name):
+        with self._lock:
+            self.probe_latency.pop(name, None)
+            for key in [key for key in self.probe_results if key[0] == name]:
+                del self.probe_results[key]
+
+    def timed(self, view):
+        """View decorator recording latency and status per route; use in `decorators`."""
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            status = 500
+            try:
+                response = view(*args, **kwargs)
+                status = response.status_code
+                return response
+            except HTTPException as e:
+                status = e.code
+                raise
+            finally:
+                rule = request.url_rule.rule if request.url_rule else request.path
+                self.observe_request(request.method, rule, status, (time.perf_counter() - start) * 1000)
+        return wrapper
+
+    def _histogram_lines(self, metric, histogram, **labels):
+        for bound, total in histogram.cumulative():
+            yield f"{metric}_bucket{_labels(**labels, le=bound)} {total}"
+        yield f"{metric}_sum{_labels(**labels)} {round(histogram.sum, 3)}"
+        yield f"{metric}_count{_labels(**labels)} {histogram.count}"
+
+    def render(self, gauges=None):
+        """Everything recorded so far, plus `gauges` ({name: value}), as text."""
+        with self._lock:
+            lines = [
+                "# HELP health_probe_latency_ms Health check latency per service",
+                "# TYPE health_probe_latency_ms histogram",
+            ]
+            for name, histogram in sorted(self.probe_latency.items()):
+                lines.extend(self._histogram_lines("health_probe_latency_ms", histogram, service=name))
+            lines += [
+                "# HELP health_probe_results_total Health checks per service and outcome",
+                "# TYPE health_probe_results_total counter",
+            ]
+            for (name, result), count in sorted(self.probe_results.items()):
+                lines.append(f"health_probe_results_total{_labels(service=name, outcome=result)} {count}")
+            lines += [
+                "# HELP http_request_latency_ms API request latency per route",
+                "# TYPE http_request_latency_ms histogram",
+            ]
+            for (method, route), histogram in sorted(self.request_latency.items()):
+                lines.extend(self._histogram_lines("http_request_latency_ms", histogram, method=method, route=route))
+            lines += [
+                "# HELP http_requests_total API requests per route and status",
+                "# TYPE http_requests_total counter",
+            ]
+            for (method, route, status), count in sorted(self.request_counts.items()):
+                lines.append(f"http_requests_total{_labels(method=method, route=route, status=status)} {count}")
+        for name, value in (gauges or {}).items():
+            if value is not None:
+                lines += [f"# TYPE {name} gauge", f"{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+
+# Shared by the probes, the API namespace and /metrics
+metrics = Metrics()
@@ -0,0 +1,214 @@
+import json
+import os
+import threading
+from collections import namedtuple
+from itertools import islice
+from types import MappingProxyType
+from urllib.parse import urlparse
+from app.etag import content_etag
+
+
+def freeze(services):
+    return MappingProxyType({name: MappingProxyType(dict(svc)) for name, svc in services.items()})
+
+
+def host_of(svc):
+    try:
+        return urlparse(svc.get("url", "")).hostname
+    except ValueError:
+        return None  # e.g. "http://[oops"; indexed under no host
+
+
+class ChangeTracker(dict):
+    """dict that remembers which keys were set or deleted."""
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.changed = set()
+
+    def __setitem__(self, name, value):
+        self.changed.add(name)
+        super().__setitem__(name, value)
+
+    def __delitem__(self, name):
+        self.changed.add(name)
+        super().__delitem__(name)
+
+    def pop(self, name, *default):
+        self.changed.add(name)
+        return super().pop(name, *default)
+
+    def update(self, *args, **kwargs):
+        for name, value in dict(*args, **kwargs).items():
+            self[name] = value
+
+
+# One published version of the registry: the services plus env/host indexes
+# mapping to insertion-ordered {name: None} buckets, and the ETag of the
+# services.json it came from. Never changed in place.
+State = namedtuple("State", ["services", "by_env", "by_host", "revision", "etag"])
+
+
+class ServiceRegistry:
+    """services.json held in memory as an immutable snapshot.
+
+    Readers just take the current snapshot, without locking. Writers hold
+    one lock, change a copy, write it to a temp file that replaces
+    services.json atomically, and then publish the copy as the new
+    snapshot. The file is only parsed again when its mtime or size shows
+    that something else changed it.
+
+    Each snapshot comes with indexes by env and by URL host. A mutation
+    only copies the index buckets of the services it touched.
+    """
+
+    def __init__(self, path, sample=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._state = State(freeze({}), {}, {}, 0, content_etag(b""))
+        self._stamp = None
+        with self._lock:
+            if not os.path.exists(path) and sample is not None:
+                self._write(sample)
+            self._load()
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _load(self):
+        stamp = self._stat()
+        data = b""
+        if stamp is not None:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        self._state = self._index(json.loads(data) if data else {})._replace(etag=content_etag(data))
+        self._stamp = stamp
+
+    @property
+    def revision(self):
+        return self._state.revision
+
+    @property
+    def etag(self):
+        """Hash of services.json, the same in every process that has loaded it."""
+        return self.state().etag
+
+    def _index(self, services, changed=None):
+        """The next State for `services`; only `changed` names are re-indexed."""
+        old = self._state
+        if changed is None:
+            frozen = freeze(services)
+            by_env, by_host = {}, {}
+            for name, svc in frozen.items():
+                by_env.setdefault(svc.get("env"), {})[name] = None
+                by_host.setdefault(host_of(svc), {})[name] = None
+        else:
+            frozen = dict(old.services)
+            by_env, by_host = dict(old.by_env), dict(old.by_host)
+            copied = set()
+
+            def bucket(index, key):
+                # Copy a bucket the first time this mutation touches it
+                if (id(index), key) not in copied:
+                    copied.add((id(index), key))
+                    index[key] = dict(index.get(key, {}))
+                return index[key]
+
+            for name in changed:
+                if name in old.services:
+                    bucket(by_env, old.services[name].get("env")).pop(name, None)
+                    bucket(by_host, host_of(old.services[name])).pop(name, None)
+                    if name not in services:
+                        del frozen[name]
+                if name in services:
+                    svc = MappingProxyType(dict(services[name]))
+                    frozen[name] = svc
+                    bucket(by_env, svc.get("env"))[name] = None
+                    bucket(by_host, host_of(svc))[name] = None
+            frozen = MappingProxyType(frozen)
+        return State(frozen, by_env, by_host, old.revision + 1, None)
+
+    def _write(self, services):
+        # Returns the ETag of what was written
+        data = json.dumps(services, indent=2).encode()
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        return content_etag(data)
+
+    def _refresh(self):
+        if self._stat() != self._stamp:
+            self._load()
+
+    def state(self):
+        if self._stat() != self._stamp:
+            with self._lock:
+                self._refresh()
+        return self._state
+
+    def snapshot(self):
+        return self.state().services
+
+    def query(self, env=None, host=None, offset=0, limit=None):
+        """Return (total, [(name, svc), ...]) for services matching env/host.
+
+        Uses the indexes, so the cost follows the size of the matching
+        buckets rather than the whole registry.
+        """
+        state = self.state()
+        if env is None and host is None:
+            names = state.services
+            total = len(names)
+        else:
+            buckets = []
+            if env is not None:
+                buckets.append(state.by_env.get(env, {}))
+            if host is not None:
+                buckets.append(state.by_host.get(host, {}))
+            smallest = min(buckets, key=len)
+            if len(buckets) == 1:
+                names = smallest
+                total = len(names)
+            else:
+                names = [name for name in smallest if all(name in b for b in buckets)]
+                total = len(names)
+        end = None if limit is None else offset + limit
+        return total, [(name, state.services[name]) for name in islice(names, offset, end)]
+
+    def mutate(self, change):
+        """Apply `change(services)` to a mutable copy and persist it.
+
+        Returns whatever `change` returns. If it returns False nothing is
+        written.
+        """
+        with self._lock:
+            self._refresh()
+            services = ChangeTracker((name, dict(svc)) for name, svc in self._state.services.items())
+            services.changed.clear()
+            result = change(services)
+            if result is not False:
+                # Index before saving so a snapshot that cannot be published
+                # never reaches services.json
+                state = self._index(services, services.changed)
+                self._state = state._replace(etag=self._write(services))
+                self._stamp = self._stat()
+            return result
+
+    def put(self, name, svc):
+        def change(services):
+            services[name] = svc
+        self.mutate(change)
+
+    def delete(self, name):
+        def change(services):
+            if name not in services:
+                return False
+            del services[name]
+        return self.mutate(change) is not False
@@ -0,0 +1,139 @@
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from app.health import probe
+from app.metrics import metrics
+
+
+def endpoint(svc):
+    return svc["url"] + svc["health_check"]
+
+
+class HealthScheduler:
+    """Probes every registered service in the background and caches results.
+
+    Each service is checked every `check_interval` seconds (its own field,
+    or `default_interval`), give or take `jitter` so checks do not line up.
+    The newest result and the last `history` latencies are kept per service.
+    """
+
+    def __init__(self, load_services, default_interval=30, jitter=0.1, history=20, concurrency=32, timeout=2):
+        self.load_services = load_services
+        self.default_interval = default_interval
+        self.jitter = jitter
+        self.history = history
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self._pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="health-check")
+        self._lock = threading.Lock()
+        self._latest = {}
+        self._history = {}
+        self._endpoints = {}  # the URL each cached result came from
+        self._due = {}
+        self._in_flight = set()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def interval(self, svc):
+        return svc.get("check_interval") or self.default_interval
+
+    def _next_due(self, svc, now):
+        interval = self.interval(svc)
+        return now + interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def record(self, name, svc, result):
+        """Cache `result` of probing `svc`; a new endpoint starts a new history."""
+        entry = dict(result, checked_at=time.time())
+        with self._lock:
+            if self._endpoints.get(name) != endpoint(svc):
+                self._endpoints[name] = endpoint(svc)
+                self._history.pop(name, None)
+            self._latest[name] = entry
+            self._history.setdefault(name, deque(maxlen=self.history)).append(
+                {"checked_at": entry["checked_at"], "status": result["status"], "latency_ms": result.get("latency_ms")}
+            )
+        return entry
+
+    def check_now(self, name, svc):
+        return self.record(name, svc, probe(svc, self.timeout, name))
+
+    def finished(self, name):
+        with self._lock:
+            self._in_flight.discard(name)
+
+    def _run_check(self, name, svc):
+        try:
+            self.check_now(name, svc)
+        finally:
+            self.finished(name)
+
+    def claim_due(self):
+        """Services whose check is due, marked in flight, and seconds to wait.
+
+        Whoever runs the checks calls finished(name) after each one, so the
+        thread pool here and the asyncio loop in asgi.py share this bookkeeping.
+        """
+        services = self.load_services()
+        now = time.monotonic()
+        due = []
+        with self._lock:
+            for name in list(self._due):
+                if name not in services:
+                    del self._due[name]
+                    self._latest.pop(name, None)
+                    self._history.pop(name, None)
+                    self._endpoints.pop(name, None)
+                    metrics.forget(name)
+            for name, svc in services.items():
+                if name not in self._due:
+                    # Spread the first round of checks over one interval
+                    self._due[name] = now + random.uniform(0, self.interval(svc))
+                if self._due[name] <= now and name not in self._in_flight:
+                    self._in_flight.add(name)
+                    self._due[name] = self._next_due(svc, now)
+                    due.append((name, svc))
+            next_due = min(self._due.values(), default=now + 1)
+        return due, max(0.05, min(next_due - now, 1.0))
+
+    def _tick(self):
+        due, wait = self.claim_due()
+        for name, svc in due:
+            self._pool.submit(self._run_check, name, svc)
+        return wait
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._stop.wait(self._tick())
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="health-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def cached(self, name, svc):
+        """Latest result for `name` with its age and history, or None.
+
+        None as well if the result was for another URL than svc's current one.
+        """
+        with self._lock:
+            if self._endpoints.get(name) != endpoint(svc):
+                return None
+            entry = self._latest.get(name)
+            history = list(self._history.get(name, ()))
+        if entry is None:
+            return None
+        age = time.time() - entry["checked_at"]
+        return dict(
+            entry,
+            checked_at=datetime.fromtimestamp(entry["checked_at"], timezone.utc).isoformat(),
+            age_seconds=round(age, 1),
+            stale=age > 2 * self.interval(svc),
+            history=[dict(h, checked_at=datetime.fromtimestamp(h["checked_at"], timezone.utc).isoformat()) for h in history]
+        )
@@ -0,0 +1,28 @@
+from flask import Flask, Response
+from flask_restx import Api
+from app.endpoints import ns as service_namespace
+from app.health import client
+from app.metrics import metrics
+
+# Importing this module starts nothing; run.py (WSGI) and asgi.py each
+# start their own background health checks
+app = Flask(__name__)
+api = Api(
+    app,
+    title="Service Endpoints API",
+    version="1.0",
+    description="Manage and test internal/external service endpoints",
+    doc="/docs"
+)
+
+api.add_namespace(service_namespace, path="/services")
+
+@app.route("/metrics")
+def metrics_text():
+    stats = client.stats()
+    gauges = {
+        "health_client_requests": stats["requests"],
+        "health_client_connections_opened": stats["connections_opened"],
+        "health_client_reuse_rate": stats["reuse_rate"],
+    }
+    return Response(metrics.render(gauges), mimetype="text/plain; version=0.0.4")
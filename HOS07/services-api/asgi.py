@@ -0,0 +1,131 @@
+"""ASGI entry point: health checks run as coroutines on one event loop.
+
+    uvicorn asgi:app --port 5000
+
+The health check routes (/services/<name>/check and /services/check-all)
+are handled here with one shared aiohttp session, so a slow service only
+holds a coroutine, not a worker thread. The background health checks run
+as tasks on the same loop and session, started from the lifespan startup
+event. Every other route is the Flask app from app/web.py, served through
+asgiref's WsgiToAsgi.
+"""
+import asyncio
+import json
+import re
+import time
+from urllib.parse import parse_qs
+from asgiref.wsgi import WsgiToAsgi
+from app.async_health import check_all, make_client, probe, run_scheduler
+from app.endpoints import load_services, registry, scheduler
+from app.health import default_deadline
+from app.metrics import metrics
+from app.web import app as flask_app
+
+
+def query_arg(query, name, default, type):
+    try:
+        return type(query[name][0])
+    except (KeyError, IndexError, ValueError):
+        return default
+
+
+class AsyncServices:
+    def __init__(self, wsgi_app):
+        self.wsgi = WsgiToAsgi(wsgi_app)
+        self.client = None
+        self.scheduler_task = None
+        # (pattern, handler, Flask rule used as the metrics route label)
+        self.routes = [
+            (re.compile(r"^/services/check-all/?$"), self.check_all, "/services/check-all"),
+            (re.compile(r"^/services/check-all/([^/]+)$"), self.check_env, "/services/check-all/<string:env>"),
+            (re.compile(r"^/services/([^/]+)/check$"), self.check_one, "/services/<string:name>/check"),
+        ]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self.lifespan(receive, send)
+        if scope["type"] == "http" and scope["method"] == "GET":
+            for pattern, handler, rule in self.routes:
+                match = pattern.match(scope["path"])
+                if match:
+                    return await self.respond(handler, rule, match.groups(), scope, send)
+        await self.wsgi(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                self.start()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.stop()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def start(self):
+        if self.client is None:
+            self.client = make_client()
+            self.scheduler_task = asyncio.ensure_future(run_scheduler(self.client, scheduler))
+
+    async def stop(self):
+        if self.scheduler_task is not None:
+            self.scheduler_task.cancel()
+            try:
+                await self.scheduler_task
+            except asyncio.CancelledError:
+                pass
+        if self.client is not None:
+            await self.client.close()
+
+    async def respond(self, handler, rule, args, scope, send):
+        start = time.perf_counter()
+        # Servers without lifespan support start on the first request
+        self.start()
+        query = parse_qs(scope["query_string"].decode("latin-1"))
+        status, data = await handler(query, *args)
+        body = json.dumps(data).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        })
+        await send({"type": "http.response.body", "body": body})
+        metrics.observe_request("GET", rule, status, (time.perf_counter() - start) * 1000)
+
+    async def check_one(self, query, name):
+        services = load_services()
+        if name not in services:
+            return 404, {"message": "Service not found"}
+        svc = services[name]
+        result = None if query.get("fresh") == ["1"] else scheduler.cached(name, svc)
+        if result is None:
+            scheduler.record(name, svc, await probe(self.client, svc, scheduler.timeout, name))
+            result = scheduler.cached(name, svc)
+        return 200, result
+
+    async def sweep(self, query, services):
+        concurrency = min(max(query_arg(query, "concurrency", 64, int), 1), 512)
+        timeout = query_arg(query, "timeout", 2, float)
+        deadline = query_arg(query, "deadline", default_deadline(timeout), float)
+        start = time.perf_counter()
+        results = await check_all(self.client, services, concurrency=concurrency, timeout=timeout, deadline=deadline)
+        for name, result in results.items():
+            if result["status"] != "timeout":
+                scheduler.record(name, services[name], result)
+        healthy = sum(1 for r in results.values() if isinstance(r["status"], int) and r["status"] < 400)
+        return 200, {
+            "checked": len(results),
+            "healthy": healthy,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+            "results": results
+        }
+
+    async def check_all(self, query):
+        return await self.sweep(query, load_services())
+
+    async def check_env(self, query, env):
+        _, services = registry.query(env=env)
+        return await self.sweep(query, dict(services))
+
+
+app = AsyncServices(flask_app)
@@ -0,0 +1,210 @@
+"""Concurrent health check benchmark: sync Flask app vs. the ASGI entry point.
+
+Starts a local fake service that answers health checks after --delay
+seconds, registers --services services pointing at it, then runs each app
+in its own process and drives GET /services/<name>/check?fresh=1 at the
+given concurrency, followed by --sweeps full /services/check-all sweeps.
+Reports p50/p95/p99 latency, requests per second and the peak number of
+threads in the server process.
+
+    python benchmark.py --services 200 --requests 1000 --concurrency 100 --delay 0.2
+    python benchmark.py --modes async --json
+"""
+import argparse, http.client, json, os, socket, subprocess, sys, tempfile, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MODES = ["sync", "async"]
+
+
+def start_fake_service(delay):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            time.sleep(delay)
+            body = b'{"status": "ok"}'
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        request_queue_size = 1024
+
+        def handle_error(self, request, client_address):
+            pass  # clients hanging up early are expected
+
+    server = Server(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def write_services(data_dir, port, count):
+    envs = ["dev", "staging", "production"]
+    services = {
+        f"svc{i}": {"url": f"http://127.0.0.1:{port}", "health_check": "/health", "env": envs[i % 3]}
+        for i in range(count)
+    }
+    with open(os.path.join(data_dir, "services.json"), "w") as f:
+        json.dump(services, f, indent=2)
+    return list(services)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(mode, data_dir, port):
+    if mode == "sync":
+        command = [sys.executable, "-c", f"from run import app; app.run(port={port}, threaded=True)"]
+    else:
+        command = [sys.executable, "-m", "uvicorn", "asgi:app", "--port", str(port), "--log-level", "warning"]
+    env = dict(os.environ, PYTHONPATH=HERE, HEALTH_CHECK_INTERVAL="86400", HEALTH_POOL_SIZE="512")
+    process = subprocess.Popen(command, cwd=data_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(200):
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/services/")
+            conn.getresponse().read()
+            return process
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError(f"{mode} server did not start")
+
+
+class ThreadSampler:
+    """Tracks the highest thread count of a process (Linux only)."""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.peak = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(0.02):
+            try:
+                with open(f"/proc/{self.pid}/status") as f:
+                    for line in f:
+                        if line.startswith("Threads:"):
+                            self.peak = max(self.peak or 0, int(line.split()[1]))
+            except OSError:
+                return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def drive(port, paths, concurrency, timeout):
+    local = threading.local()
+    latencies = []
+    errors = []
+
+    def one(path):
+        if not hasattr(local, "conn"):
+            local.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+        start = time.perf_counter()
+        try:
+            local.conn.request("GET", path)
+            response = local.conn.getresponse()
+            response.read()
+            if response.status >= 400:
+                errors.append(path)
+        except Exception:
+            local.conn.close()
+            errors.append(path)
+            return
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, paths))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": len(paths),
+        "errors": len(errors),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "throughput_rps": len(paths) / elapsed,
+    }
+
+
+def run_mode(mode, data_dir, names, args):
+    port = free_port()
+    process = start_server(mode, data_dir, port)
+    try:
+        results = []
+        with ThreadSampler(process.pid) as sampler:
+            paths = [f"/services/{names[i % len(names)]}/check?fresh=1" for i in range(args.requests)]
+            results.append(dict(drive(port, paths, args.concurrency, args.timeout), endpoint="check"))
+        results[-1]["peak_threads"] = sampler.peak
+        if args.sweeps:
+            with ThreadSampler(process.pid) as sampler:
+                paths = [f"/services/check-all?concurrency={args.concurrency}"] * args.sweeps
+                results.append(dict(drive(port, paths, 1, args.timeout), endpoint="check-all"))
+            results[-1]["peak_threads"] = sampler.peak
+        for r in results:
+            r["mode"] = mode
+        return results
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--services", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=1000, help="single-service checks per mode")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--delay", type=float, default=0.2, help="seconds the fake service takes to answer")
+    parser.add_argument("--sweeps", type=int, default=3, help="full check-all sweeps per mode")
+    parser.add_argument("--timeout", type=float, default=60, help="client timeout per request")
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    fake = start_fake_service(args.delay)
+    with tempfile.TemporaryDirectory() as data_dir:
+        names = write_services(data_dir, fake.server_port, args.services)
+        results = []
+        for mode in args.modes.split(","):
+            results.extend(run_mode(mode, data_dir, names, args))
+    fake.shutdown()
+
+    if args.json:
+        print(json.dumps({"config": vars(args), "results": results}, indent=2))
+        return
+    print(f"services={args.services} requests={args.requests} concurrency={args.concurrency} delay={args.delay}s")
+    print(f"{'mode':<7}{'endpoint':<11}{'reqs':>6}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'req/s':>9}{'threads':>9}")
+    for r in results:
+        print(f"{r['mode']:<7}{r['endpoint']:<11}{r['requests']:>6}{r['errors']:>8}{r['p50_ms']:>9.1f}"
+              f"{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['throughput_rps']:>9.1f}{r['peak_threads'] or 0:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,11 @@
-from flask import Flask
-from flask_restx import Api
-from app.endpoints import ns as service_namespace
+import os
+from app.endpoints import scheduler
+from app.web import app
 
-app = Flask(__name__)
-api = Api(
-    app,
-    title="Service Endpoints API",
-    version="1.0",
-    description="Manage and test internal/external service endpoints",
-    doc="/docs"
-)
-
-api.add_namespace(service_namespace, path="/services")
+# WSGI entry point: health checks run on the scheduler's thread pool.
+# The debug reloader's parent process only watches files and serves nothing
+if __name__ != "__main__" or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+    scheduler.start()
 
 if __name__ == "__main__":
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
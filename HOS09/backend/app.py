@@ -1,6 +1,15 @@
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, stream_with_context
 from flask_cors import CORS
-import json, os
+import atexit, gzip, hashlib, json, os, threading
+from feedback_log import FeedbackLog
+from kpi_store import KpiStore
+from risk_store import RiskStore
+from risk_summary import RiskSummary
+
+try:
+    import brotli  # optional; br is only offered when it is installed
+except ImportError:
+    brotli = None
 
 app = Flask(__name__)
 CORS(app)
@@ -9,6 +18,7 @@ DATA_DIR = './data'
 KPI_FILE = os.path.join(DATA_DIR, 'kpis.json')
 KPI_TARGETS_FILE = os.path.join(DATA_DIR, 'kpi_targets.json')
 RISK_FILE = os.path.join(DATA_DIR, 'risks.json')
+PREDEFINED_RISK_FILE = os.path.join(DATA_DIR, 'predefined_risks.json')
 
 def read_json(file):
     with open(file, 'r') as f:
@@ -18,68 +28,240 @@ def write_json(file, data):
     with open(file, 'w') as f:
         json.dump(data, f, indent=2)
 
+# Seconds the dashboard may reuse a response before revalidating its ETag
+CACHE_MAX_AGE = int(os.environ.get('CACHE_MAX_AGE', '0'))
+
+# file -> (revision, parsed data); reparsed only when the file changes
+_json_cache = {}
+_json_cache_lock = threading.Lock()
+
+def file_revision(file):
+    # Any write changes the mtime or the size, so this works as a version
+    st = os.stat(file)
+    return '%x-%x' % (st.st_mtime_ns, st.st_size)
+
+def read_json_cached(file):
+    revision = file_revision(file)
+    cached = _json_cache.get(file)
+    if cached is None or cached[0] != revision:
+        with _json_cache_lock:
+            cached = (revision, read_json(file))
+            _json_cache[file] = cached
+    return cached
+
+def conditional(revision, load):
+    """JSON of load() with `revision` as its ETag, or 304 if the client has it."""
+    if request.if_none_match.contains_weak(revision):
+        response = app.response_class(status=304)
+    else:
+        response = jsonify(load())
+    response.set_etag(revision)
+    response.headers['Cache-Control'] = 'max-age=%d, must-revalidate' % CACHE_MAX_AGE if CACHE_MAX_AGE else 'no-cache'
+    return response
+
+def conditional_json(file):
+    return conditional(file_revision(file), lambda: read_json_cached(file)[1])
+
+kpi_store = KpiStore(KPI_FILE, window=int(os.environ.get('KPI_WINDOW', '3')))
+
+def kpi_targets():
+    return read_json_cached(KPI_TARGETS_FILE)[1] if os.path.exists(KPI_TARGETS_FILE) else {}
+
 @app.route('/api/kpi')
 def get_kpis():
-    return jsonify(read_json(KPI_FILE))
+    return conditional(kpi_store.etag, kpi_store.as_dict)
+
+@app.route('/api/kpi', methods=['POST'])
+def add_kpi_sample():
+    # One sprint's values: {"test_coverage": 74, "mttd": 6, ...}
+    sample = request.get_json(silent=True)
+    if isinstance(sample, dict) and 'stats' in sample:
+        # GET /api/kpi/stats is the stats route, so the series could not be read
+        return jsonify({'error': "'stats' is reserved and cannot be a metric name"}), 400
+    try:
+        kpi_store.append(sample)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    targets = kpi_targets()
+    return jsonify({m: kpi_store.series[m].stats(targets.get(m)) for m in sample}), 201
+
+@app.route('/api/kpi/stats')
+def get_kpi_stats():
+    targets = kpi_targets()
+    return jsonify({m: series.stats(targets.get(m)) for m, series in list(kpi_store.series.items())})
+
+@app.route('/api/kpi/<metric>')
+def get_kpi_series(metric):
+    # ?last=N or ?start=&end= pick sprints; ?points=M averages them into M buckets
+    series = kpi_store.series.get(metric)
+    if series is None:
+        return jsonify({'error': 'Unknown metric'}), 404
+    start, end = series.window_bounds(
+        request.args.get('start', type=int),
+        request.args.get('end', type=int),
+        request.args.get('last', type=int)
+    )
+    points = request.args.get('points', type=int)
+    values = series.downsample(start, end, points) if points and points > 0 else series.values[start:end]
+    return jsonify({
+        'metric': metric,
+        'start': start,
+        'end': end,
+        'values': values,
+        'stats': series.stats(kpi_targets().get(metric))
+    })
 
 @app.route('/api/kpi_targets')
 def get_targets():
-    return jsonify(read_json(KPI_TARGETS_FILE))
+    return conditional_json(KPI_TARGETS_FILE)
+
+risk_store = RiskStore(RISK_FILE, PREDEFINED_RISK_FILE)
+risk_summary = RiskSummary(risk_store)
 
 @app.route('/api/risks')
 def get_risks():
-    return jsonify(read_json(RISK_FILE))
+    return conditional(risk_store.etag, risk_store.active_list)
 
 @app.route('/api/risks', methods=['POST'])
 def add_risk():
-    new_risk = request.get_json()
-    risk_file = './data/risks.json'
-    predefined_file = './data/predefined_risks.json'
-
-    # Append to risks.json
-    risks = []
-    if os.path.exists(risk_file):
-        with open(risk_file) as f:
-            risks = json.load(f)
-    risks.append(new_risk)
-    with open(risk_file, 'w') as f:
-        json.dump(risks, f, indent=2)
-
-    # Remove from predefined_risks.json
-    if os.path.exists(predefined_file):
-        with open(predefined_file) as f:
-            predefined = json.load(f)
-        predefined = [r for r in predefined if r.get('id') != new_risk.get('id')]
-        with open(predefined_file, 'w') as f:
-            json.dump(predefined, f, indent=2)
-
-    return jsonify(new_risk), 201
+    # Adds or replaces the risk by id and takes it off the predefined list
+    new_risk = request.get_json(silent=True)
+    try:
+        created = risk_store.activate(new_risk)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(new_risk), 201 if created else 200
 
+@app.route('/api/risks/summary')
+def get_risk_summary():
+    # Scores, 5x5 heatmap and top-K without shipping every risk
+    top = min(max(request.args.get('top', 10, type=int), 0), 1000)
+    filters = {name: request.args.get(name, type=int) for name in ('min_score', 'max_score', 'likelihood', 'impact')}
+    return conditional(risk_store.etag, lambda: risk_summary.summary(top=top, **filters))
+
+
+feedback_log = FeedbackLog(
+    os.path.join(DATA_DIR, 'feedback.jsonl'),
+    legacy_path=os.path.join(DATA_DIR, 'feedback.json'),
+    flush_interval=float(os.environ.get('FEEDBACK_FLUSH_INTERVAL', '0.2'))
+)
+atexit.register(feedback_log.close)
 
 @app.route('/api/feedback-submission', methods=['POST'])
 def save_metric_feedback():
-    feedback = request.get_json()
-    filepath = './data/feedback.json'
-    if os.path.exists(filepath):
-        with open(filepath) as f:
-            all_feedback = json.load(f)
+    feedback = request.get_json(silent=True)
+    if not isinstance(feedback, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    try:
+        feedback_log.submit([feedback])
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 503
+    return jsonify({"status": "saved"}), 201
+
+@app.route('/api/feedback-submission/bulk', methods=['POST'])
+def save_metric_feedback_bulk():
+    # A JSON array, or NDJSON with one submission per line
+    if request.mimetype == 'application/x-ndjson':
+        try:
+            batch = [json.loads(line) for line in request.get_data(as_text=True).splitlines() if line.strip()]
+        except json.JSONDecodeError as e:
+            return jsonify({'error': 'Invalid NDJSON: %s' % e}), 400
     else:
-        all_feedback = []
+        batch = request.get_json(silent=True)
+        if not isinstance(batch, list):
+            return jsonify({'error': 'Expected a JSON array'}), 400
+    for i, feedback in enumerate(batch):
+        if not isinstance(feedback, dict):
+            return jsonify({'error': 'Submission %d is not a JSON object' % i}), 400
+    try:
+        count = feedback_log.submit(batch)
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 503
+    return jsonify({'status': 'saved', 'count': count}), 201
 
-    all_feedback.append(feedback)
-    with open(filepath, 'w') as f:
-        json.dump(all_feedback, f, indent=2)
-    return jsonify({"status": "saved"}), 201
+@app.route('/api/feedback')
+def get_feedback():
+    """Stream saved feedback as NDJSON, ?cursor=N&limit=M at a time.
+
+    X-Next-Cursor holds the cursor for the next page when there is one.
+    """
+    cursor = max(request.args.get('cursor', 0, type=int), 0)
+    limit = min(max(request.args.get('limit', 1000, type=int), 1), 10000)
+    total = len(feedback_log)
+    end = min(cursor + limit, total)
+    response = app.response_class(
+        stream_with_context(feedback_log.read_lines(cursor, end)),
+        mimetype='application/x-ndjson'
+    )
+    response.headers['X-Total-Count'] = str(total)
+    if end < total:
+        response.headers['X-Next-Cursor'] = str(end)
+    return response
 
 
 @app.route('/api/predefined_risks', methods=['GET'])
 def get_predefined_risks():
-    filepath = './data/predefined_risks.json'
-    if not os.path.exists(filepath):
-        return jsonify([])  # Return empty list if the file doesn't exist
-    with open(filepath) as f:
-        risks = json.load(f)
-    return jsonify(risks)
+    return conditional(risk_store.etag, risk_store.predefined_list)
+
+# Everything the dashboard loads on first paint: name -> (revision, data)
+DASHBOARD_PARTS = {
+    'kpi': (lambda: kpi_store.etag, lambda: kpi_store.as_dict()),
+    'kpi_targets': (lambda: file_revision(KPI_TARGETS_FILE), lambda: read_json_cached(KPI_TARGETS_FILE)[1]),
+    'risks': (lambda: risk_store.etag, lambda: risk_store.active_list()),
+    'predefined_risks': (lambda: risk_store.etag, lambda: risk_store.predefined_list()),
+}
+
+# (etag, encoding) -> encoded body; emptied when it grows past a few versions
+_dashboard_cache = {}
+_dashboard_cache_lock = threading.Lock()
+
+def pick_encoding():
+    if brotli is not None and request.accept_encodings['br']:
+        return 'br'
+    if request.accept_encodings['gzip']:
+        return 'gzip'
+    return 'identity'
+
+def encode_body(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=6)
+    return body
+
+@app.route('/api/dashboard')
+def get_dashboard():
+    """kpi, kpi_targets, risks and predefined_risks in one response.
+
+    ?fields=kpi,risks limits it to some parts. The encoded body is cached
+    until one of the parts changes.
+    """
+    fields = [f for f in request.args.get('fields', ','.join(DASHBOARD_PARTS)).split(',') if f]
+    unknown = [f for f in fields if f not in DASHBOARD_PARTS]
+    if unknown:
+        return jsonify({'error': 'Unknown fields: %s' % ', '.join(unknown)}), 400
+    revisions = ','.join('%s=%s' % (f, DASHBOARD_PARTS[f][0]()) for f in fields)
+    encoding = pick_encoding()
+    etag = '%s-%s' % (hashlib.sha1(revisions.encode()).hexdigest()[:16], encoding)
+    cache_control = 'max-age=%d, must-revalidate' % CACHE_MAX_AGE if CACHE_MAX_AGE else 'no-cache'
+    if request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+    else:
+        body = _dashboard_cache.get((etag, encoding))
+        if body is None:
+            data = {f: DASHBOARD_PARTS[f][1]() for f in fields}
+            body = encode_body(json.dumps(data).encode(), encoding)
+            with _dashboard_cache_lock:
+                if len(_dashboard_cache) > 32:
+                    _dashboard_cache.clear()
+                _dashboard_cache[(etag, encoding)] = body
+        response = app.response_class(body, mimetype='application/json')
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    response.vary.add('Accept-Encoding')
+    return response
 
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
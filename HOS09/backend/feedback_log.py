@@ -0,0 +1,165 @@
+import json, logging, os, threading
+from array import array
+from storage import atomic_write
+
+log = logging.getLogger(__name__)
+
+
+def migrate_json_array(legacy_path, path):
+    """Copy a legacy JSON array file into one JSON record per line.
+
+    The legacy file is left as it is; it is only read again if the NDJSON
+    file is removed.
+    """
+    with open(legacy_path) as f:
+        try:
+            records = json.load(f)
+        except json.JSONDecodeError:
+            records = []  # File exists but is empty or corrupt
+    atomic_write(path, lambda f: f.writelines(json.dumps(record) + '\n' for record in records))
+
+
+class FeedbackLog:
+    """Append-only NDJSON feedback file written by a background thread.
+
+    submit() only adds records to an in-memory buffer. The writer thread
+    appends the whole buffer in one write every `flush_interval` seconds,
+    or sooner once `max_buffer` records are waiting, so a burst of
+    submissions costs one disk write per batch instead of one per request.
+    Records become readable once written; the byte offset where every line
+    ends is kept so pages can be read straight from the file. Lines that
+    other processes append to the same file are indexed as they are seen.
+
+    A failed write keeps its records in the buffer and is retried on the
+    next flush. submit() raises RuntimeError once `max_buffer` records are
+    waiting behind a failed write, or if the writer thread has died.
+    """
+
+    def __init__(self, path, legacy_path=None, flush_interval=0.2, max_buffer=1000):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._buffer = []
+        self._error = None
+        self._ends = array('q')
+        if legacy_path and os.path.exists(legacy_path) and not os.path.exists(path):
+            migrate_json_array(legacy_path, path)
+        self._size = self._repair()
+        self._file = open(path, 'ab')
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='feedback-writer', daemon=True)
+        self._thread.start()
+
+    def _repair(self):
+        # Index the lines and drop a torn last line left behind by a crash
+        if not os.path.exists(self.path):
+            return 0
+        good_size = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                good_size += len(line)
+                self._ends.append(good_size)
+        if good_size != os.path.getsize(self.path):
+            with open(self.path, 'r+b') as f:
+                f.truncate(good_size)
+        return good_size
+
+    def submit(self, records):
+        lines = [(json.dumps(record) + '\n').encode() for record in records]
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('Feedback log is closed')
+            if not self._thread.is_alive():
+                raise RuntimeError('Feedback writer has stopped')
+            if self._error is not None and len(self._buffer) >= self.max_buffer:
+                raise RuntimeError('Feedback log cannot be written: %s' % self._error)
+            self._buffer.extend(lines)
+            full = len(self._buffer) >= self.max_buffer
+        if full:
+            self._wake.set()
+        return len(lines)
+
+    def _scan_tail(self):
+        # Index complete lines past the ones we know, e.g. from other processes
+        if os.fstat(self._file.fileno()).st_size == self._size:
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(self._size)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break  # another process is still writing this line
+                self._size += len(line)
+                self._ends.append(self._size)
+
+    def refresh(self):
+        with self._write_lock:
+            self._scan_tail()
+
+    def flush(self):
+        with self._write_lock:
+            with self._lock:
+                lines, self._buffer = self._buffer, []
+            if not lines:
+                return
+            data = b''.join(lines)
+            try:
+                self._scan_tail()
+                start = self._size
+                self._file.write(data)
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            except OSError as e:
+                with self._lock:
+                    self._buffer[:0] = lines
+                    self._error = e
+                raise
+            self._error = None
+            if os.fstat(self._file.fileno()).st_size == start + len(data):
+                for line in lines:
+                    self._size += len(line)
+                    self._ends.append(self._size)
+            else:
+                self._scan_tail()  # another process appended at the same time
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                log.exception('Writing %s failed; will retry', self.path)
+
+    def __len__(self):
+        self.refresh()
+        return len(self._ends)
+
+    def read_lines(self, start, end, chunk_size=65536):
+        """Yield the raw bytes of written lines start..end-1 in chunks."""
+        end = min(end, len(self))
+        if start >= end:
+            return
+        first = self._ends[start - 1] if start else 0
+        last = self._ends[end - 1]
+        with open(self.path, 'rb') as f:
+            f.seek(first)
+            remaining = last - first
+            while remaining > 0:
+                chunk = f.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+        self._wake.set()
+        self._thread.join()
+        self.flush()
+        self._file.close()
@@ -0,0 +1,190 @@
+import json, math, os, threading
+from collections import deque
+from storage import ContentTag, write_json_atomic
+
+
+class MetricSeries:
+    """One metric's per-sprint values and aggregates kept up to date on append.
+
+    values holds one entry per sprint; None marks a sprint in which the
+    metric was not reported and is left out of every aggregate. Appending
+    is O(1): the moving average uses a running sum over the last `window`
+    reported values, the trend slope a running least-squares fit (x is the
+    sprint index), and prefix sums and counts make any window mean O(1).
+    """
+
+    def __init__(self, window=3):
+        self.values = []
+        self.prefix = [0.0]  # prefix[i] == sum of the reported values[:i]
+        self.counts = [0]  # counts[i] == how many of values[:i] were reported
+        self.recent = deque(maxlen=window)
+        self.recent_sum = 0.0
+        self.latest = None
+        self.min = None
+        self.max = None
+        self.sum_x = 0.0
+        self.sum_xy = 0.0
+        self.sum_xx = 0.0
+
+    def append(self, value):
+        x = len(self.values)
+        self.values.append(value)
+        if value is None:
+            self.prefix.append(self.prefix[-1])
+            self.counts.append(self.counts[-1])
+            return
+        if len(self.recent) == self.recent.maxlen:
+            self.recent_sum -= self.recent[0]
+        self.recent.append(value)
+        self.recent_sum += value
+        self.prefix.append(self.prefix[-1] + value)
+        self.counts.append(self.counts[-1] + 1)
+        self.latest = value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.sum_x += x
+        self.sum_xy += x * value
+        self.sum_xx += x * x
+
+    def slope(self):
+        n = self.counts[-1]
+        if n < 2:
+            return None
+        return (n * self.sum_xy - self.sum_x * self.prefix[-1]) / (n * self.sum_xx - self.sum_x * self.sum_x)
+
+    def stats(self, target=None):
+        n = self.counts[-1]
+        latest = self.latest
+        stats = {
+            'count': n,
+            'sprints': len(self.values),
+            'latest': latest,
+            'moving_average': self.recent_sum / len(self.recent) if self.recent else None,
+            'window': self.recent.maxlen,
+            'min': self.min,
+            'max': self.max,
+            'mean': self.prefix[-1] / n if n else None,
+            'slope': self.slope(),
+            'target': target,
+        }
+        stats['distance_to_target'] = latest - target if latest is not None and target is not None else None
+        return stats
+
+    def window_bounds(self, start=None, end=None, last=None):
+        n = len(self.values)
+        if last is not None:
+            return max(n - max(last, 0), 0), n
+        start = 0 if start is None else max(0, min(start, n))
+        end = n if end is None else max(start, min(end, n))
+        return start, end
+
+    def downsample(self, start, end, points):
+        """Means of `points` equal buckets of values[start:end], in O(points).
+
+        A bucket with no reported values is None.
+        """
+        size = end - start
+        if points >= size:
+            return self.values[start:end]
+        buckets = []
+        for i in range(points):
+            lo = start + size * i // points
+            hi = start + size * (i + 1) // points
+            count = self.counts[hi] - self.counts[lo]
+            buckets.append((self.prefix[hi] - self.prefix[lo]) / count if count else None)
+        return buckets
+
+
+def finite_number(value):
+    # bool is an int subclass; huge JSON ints do not fit in a float
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return False
+    try:
+        return math.isfinite(value)
+    except OverflowError:
+        return False
+
+
+class KpiStore:
+    """KPI series held in memory, with new samples appended to a log.
+
+    kpis.json keeps its original {metric: [value per sprint]} format. New
+    samples are appended to `log_path` as one JSON line per sprint; on
+    startup the log is folded back into kpis.json and truncated.
+
+    Every sample is one sprint for every metric, so all series stay the
+    same length: metrics missing from a sample get None for that sprint,
+    and a metric seen for the first time gets None for the earlier ones.
+    """
+
+    def __init__(self, path, log_path=None, window=3):
+        self.path = path
+        self.log_path = log_path or os.path.splitext(path)[0] + '.log.jsonl'
+        self.window = window
+        self.series = {}
+        self.sprints = 0
+        self.revision = 0
+        self._tag = ContentTag(self.as_dict)
+        self._lock = threading.Lock()
+        self._load()
+        self._log = open(self.log_path, 'a')
+
+    def _load(self):
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                for metric, values in json.load(f).items():
+                    for value in values:
+                        self._series(metric).append(value)
+            # Pad series that were shorter in the file
+            self.sprints = max((len(series.values) for series in self.series.values()), default=0)
+            for series in self.series.values():
+                while len(series.values) < self.sprints:
+                    series.append(None)
+        if os.path.exists(self.log_path) and os.path.getsize(self.log_path):
+            with open(self.log_path) as f:
+                for line in f:
+                    if line.strip():
+                        self._add_sprint(json.loads(line))
+            self._compact()
+
+    def _compact(self):
+        write_json_atomic(self.path, self.as_dict())
+        open(self.log_path, 'w').close()
+
+    def _series(self, metric):
+        if metric not in self.series:
+            series = self.series[metric] = MetricSeries(self.window)
+            for _ in range(self.sprints):
+                series.append(None)
+        return self.series[metric]
+
+    def _add_sprint(self, sample):
+        for metric in sample:
+            self._series(metric)
+        for metric, series in self.series.items():
+            series.append(sample.get(metric))
+        self.sprints += 1
+
+    @property
+    def etag(self):
+        return self._tag.etag(self.revision)
+
+    def append(self, sample):
+        """Add one sprint's values, e.g. {'test_coverage': 74, 'mttd': 6}."""
+        if not isinstance(sample, dict) or not sample:
+            raise ValueError('Expected an object of metric: value pairs')
+        for metric, value in sample.items():
+            if not finite_number(value):
+                raise ValueError('Value for %s must be a finite number' % metric)
+        with self._lock:
+            self._log.write(json.dumps(sample) + '\n')
+            self._log.flush()
+            self._add_sprint(sample)
+            self.revision += 1
+
+    def as_dict(self):
+        with self._lock:
+            return {metric: list(series.values) for metric, series in self.series.items()}
+
+    def close(self):
+        self._log.close()
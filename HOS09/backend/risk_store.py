@@ -0,0 +1,130 @@
+import json, os, threading
+from storage import ContentTag, write_json_atomic
+
+
+def valid_risk(risk):
+    # Ids are dict keys and JSON values, so only non-empty strings or ints
+    if not isinstance(risk, dict):
+        return False
+    risk_id = risk.get('id')
+    if isinstance(risk_id, bool):
+        return False
+    return isinstance(risk_id, int) or (isinstance(risk_id, str) and risk_id != '')
+
+
+def index_by_id(risks):
+    # Later entries with the same id replace earlier ones (upsert)
+    index = {}
+    for risk in risks:
+        index[risk['id']] = risk
+    return index
+
+
+class RiskStore:
+    """Active and predefined risks, each held as an id -> risk dict.
+
+    Every change is one line appended to a journal, so moving a risk from
+    predefined_risks.json to risks.json commits both sides at once and
+    nothing is rewritten per request. The two JSON files are snapshots:
+    the journal is replayed on top of them at startup and folded back into
+    them (temp file + os.replace) every `compact_every` changes. Replaying
+    is idempotent, so a crash part way through compaction loses nothing.
+    """
+
+    def __init__(self, risk_path, predefined_path, journal_path=None, compact_every=1000):
+        self.risk_path = risk_path
+        self.predefined_path = predefined_path
+        self.journal_path = journal_path or os.path.splitext(risk_path)[0] + '.journal.jsonl'
+        self.compact_every = compact_every
+        self.revision = 0
+        self._tag = ContentTag(lambda: (self.active_list(), self.predefined_list()))
+        self._lock = threading.Lock()
+        self._listeners = []
+        risks, predefined = self._read(risk_path), self._read(predefined_path)
+        self.active = index_by_id(risks)
+        self.predefined = index_by_id(predefined)
+        # Rewrite the snapshots once if they held duplicate ids
+        self._pending = len(risks) - len(self.active) + len(predefined) - len(self.predefined)
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path) as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    entry = json.loads(line)
+                    if entry.get('op') == 'activate' and not valid_risk(entry.get('risk')):
+                        continue  # written before ids were checked
+                    self._apply(entry)
+                    self._pending += 1
+        if self._pending:
+            self._compact()
+        self._journal = open(self.journal_path, 'a')
+
+    def _read(self, path):
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            return json.load(f)
+
+    def _compact(self):
+        write_json_atomic(self.risk_path, list(self.active.values()))
+        write_json_atomic(self.predefined_path, list(self.predefined.values()))
+        open(self.journal_path, 'w').close()
+        self._pending = 0
+
+    def _apply(self, entry):
+        old = None
+        if entry['op'] == 'activate':
+            risk = entry['risk']
+            old = self.active.get(risk['id'])
+            self.active[risk['id']] = risk
+            self.predefined.pop(risk['id'], None)
+        return old
+
+    def _commit(self, entry):
+        # Serialize before touching the journal so a bad entry leaves no line
+        line = json.dumps(entry) + '\n'
+        self._journal.write(line)
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        old = self._apply(entry)
+        self.revision += 1
+        self._pending += 1
+        if self._pending >= self.compact_every:
+            self._compact()
+        return old
+
+    @property
+    def etag(self):
+        return self._tag.etag(self.revision)
+
+    def add_listener(self, listener):
+        """Call listener(old, new) after each change; old is None for new risks."""
+        self._listeners.append(listener)
+
+    def activate(self, risk):
+        """Insert or replace `risk` by id and drop it from the predefined list.
+
+        Returns True if the id was new.
+        """
+        if not valid_risk(risk):
+            raise ValueError('Risk must be an object with a string or integer id')
+        with self._lock:
+            old = self._commit({'op': 'activate', 'risk': risk})
+            for listener in self._listeners:
+                listener(old, risk)
+        return old is None
+
+    def get(self, risk_id):
+        return self.active.get(risk_id)
+
+    def active_list(self):
+        with self._lock:
+            return list(self.active.values())
+
+    def predefined_list(self):
+        with self._lock:
+            return list(self.predefined.values())
+
+    def close(self):
+        with self._lock:
+            self._journal.close()
@@ -0,0 +1,88 @@
+import threading
+
+LEVELS = 5
+
+# Cells of the 5x5 matrix from highest score down; ties go to higher impact
+CELLS_BY_SCORE = sorted(
+    ((l, i) for l in range(1, LEVELS + 1) for i in range(1, LEVELS + 1)),
+    key=lambda cell: (-cell[0] * cell[1], -cell[1], -cell[0])
+)
+
+
+def cell_of(risk):
+    l, i = risk.get('likelihood'), risk.get('impact')
+    if isinstance(l, int) and isinstance(i, int) and 1 <= l <= LEVELS and 1 <= i <= LEVELS:
+        return l, i
+    return None
+
+
+def level(score):
+    # Same bands as the dashboard's risk matrix colours
+    if score <= 4:
+        return 'green'
+    if score <= 9:
+        return 'yellow'
+    if score <= 16:
+        return 'orange'
+    return 'red'
+
+
+class RiskSummary:
+    """Risks bucketed by (likelihood, impact), kept in step with a RiskStore.
+
+    Every risk in a cell has the same score, so the heatmap is the bucket
+    sizes and the top K comes from walking the cells from the highest score
+    down: O(25 + K) per query, O(1) per change.
+    """
+
+    def __init__(self, store):
+        self._lock = threading.Lock()
+        self.cells = {cell: {} for cell in CELLS_BY_SCORE}
+        self.unscored = {}
+        for risk in store.active_list():
+            self._add(risk)
+        store.add_listener(self.update)
+
+    def _bucket(self, risk):
+        cell = cell_of(risk)
+        return self.unscored if cell is None else self.cells[cell]
+
+    def _add(self, risk):
+        self._bucket(risk)[risk['id']] = risk
+
+    def update(self, old, new):
+        with self._lock:
+            if old is not None:
+                self._bucket(old).pop(old['id'], None)
+            self._add(new)
+
+    def summary(self, top=10, min_score=None, max_score=None, likelihood=None, impact=None):
+        """Heatmap, per-level counts and the `top` highest scoring risks.
+
+        Filters apply to all three. heatmap[l - 1][i - 1] counts the risks
+        with likelihood l and impact i.
+        """
+        with self._lock:
+            heatmap = [[0] * LEVELS for _ in range(LEVELS)]
+            levels = {'green': 0, 'yellow': 0, 'orange': 0, 'red': 0}
+            top_risks = []
+            for l, i in CELLS_BY_SCORE:
+                score = l * i
+                if (min_score is not None and score < min_score) or (max_score is not None and score > max_score):
+                    continue
+                if (likelihood is not None and l != likelihood) or (impact is not None and i != impact):
+                    continue
+                bucket = self.cells[(l, i)]
+                heatmap[l - 1][i - 1] = len(bucket)
+                levels[level(score)] += len(bucket)
+                for risk in bucket.values():
+                    if len(top_risks) >= top:
+                        break
+                    top_risks.append(dict(risk, score=score, level=level(score)))
+            return {
+                'total': sum(levels.values()),
+                'unscored': len(self.unscored),
+                'heatmap': heatmap,
+                'levels': levels,
+                'top': top_risks,
+            }
@@ -0,0 +1,35 @@
+import hashlib, json, os
+
+
+def atomic_write(path, write):
+    """Call write(f) on a temp file, fsync it and move it over `path`."""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def write_json_atomic(path, data):
+    atomic_write(path, lambda f: json.dump(data, f, indent=2))
+
+
+class ContentTag:
+    """ETag hashed from the JSON of load(), redone only when the revision moves.
+
+    It depends on the data alone, so every worker process serving the same
+    data hands out the same tag, whatever its own revision counter says.
+    """
+
+    def __init__(self, load):
+        self.load = load
+        self._cached = (None, None)  # (revision, etag)
+
+    def etag(self, revision):
+        cached_revision, etag = self._cached
+        if cached_revision != revision:
+            data = json.dumps(self.load(), sort_keys=True).encode()
+            etag = hashlib.sha1(data).hexdigest()[:16]
+            self._cached = (revision, etag)
+        return etag
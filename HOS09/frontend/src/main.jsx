@@ -31,10 +31,13 @@ function App() {
   };
 
   useEffect(() => {
-    fetch('/api/kpi').then(res => res.json()).then(setKpiData);
-    fetch('/api/kpi_targets').then(res => res.json()).then(setKpiTargets);
-    fetch('/api/risks').then(res => res.json()).then(setRiskData);
-    fetch('/api/predefined_risks').then(res => res.json()).then(setPredefinedRisks);
+    // One request for everything the first render needs
+    fetch('/api/dashboard').then(res => res.json()).then(data => {
+      setKpiData(data.kpi);
+      setKpiTargets(data.kpi_targets);
+      setRiskData(data.risks);
+      setPredefinedRisks(data.predefined_risks);
+    });
   }, []);
 
   useEffect(() => {
@@ -125,12 +128,9 @@ function App() {
       body: JSON.stringify(newRisk)
     }).then(() => {
       // Refresh both risks and predefined risks
-      Promise.all([
-        fetch('/api/risks').then(res => res.json()),
-        fetch('/api/predefined_risks').then(res => res.json())
-      ]).then(([updatedRisks, updatedPredefined]) => {
-        setRiskData(updatedRisks);
-        setPredefinedRisks(updatedPredefined);
+      fetch('/api/dashboard?fields=risks,predefined_risks').then(res => res.json()).then(data => {
+        setRiskData(data.risks);
+        setPredefinedRisks(data.predefined_risks);
         setSelectedRisk('');
         setCustomLikelihood('');
         setCustomImpact('');
@@ -139,7 +139,8 @@ function App() {
   }
 
   if (!kpiData[selectedKPI]) return <p>Loading...</p>;
-  const current = kpiData[selectedKPI].at(-1);
+  // Sprints where the metric was not reported are null
+  const current = kpiData[selectedKPI].findLast(value => value != null);
   const target = kpiTargets[selectedKPI];
   const isHigher = selectedKPI === 'test_coverage';
   const status = getStatus(current, target, isHigher);